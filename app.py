@@ -1,18 +1,38 @@
 import os
 import json
+import re
 import sqlite3
-import requests
 import concurrent.futures
-from flask import Flask, jsonify, request, send_from_directory
+import threading
+import atexit
+import functools
+from collections import deque
+from collections import OrderedDict
+from flask import Flask, Response, g, jsonify, request, send_from_directory, stream_with_context
 from flask_cors import CORS
+from werkzeug.middleware.proxy_fix import ProxyFix
 from werkzeug.security import generate_password_hash, check_password_hash
-from deep_translator import GoogleTranslator
+from itsdangerous import BadSignature, SignatureExpired, URLSafeTimedSerializer
 import random
 import time
 import secrets
-import smtplib
 from email.message import EmailMessage
 import urllib.parse
+import http_client
+from translit import transliterate, transliterate_many
+from ranking import batch_scale, fold_interest, interest_vector, rank_results
+from swr_cache import SWRCache
+from openalex_index import OpenAlexIndex
+from translation_cache import CachedTranslator
+from history_writer import HistoryWriter
+from db import QUERIES, Database
+from otp_store import make_otp_store
+from mailer import MailQueue
+from citation_store import CitationStore
+import graph_wire
+from graph_layout import LayoutCache, apply_layout, graph_key
+from graph_analytics import rank_graph
+from graph_clusters import collapse
 
 # Load .env variables manually to avoid extra pip dependencies
 env_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), '.env')
@@ -42,35 +62,175 @@ if os.environ.get('VERCEL') == '1':
 else:
     DB_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "litmaps_clone.db")
 
+def backfill_user_interest(c):
+    """Builds interest profiles from user_history, for databases created before profiles existed."""
+    if c.execute("SELECT 1 FROM user_interest LIMIT 1").fetchone():
+        return
+    profiles = {}
+    for username, query, ts in c.execute("SELECT username, query, strftime('%s', timestamp) FROM user_history ORDER BY id"):
+        profile = profiles.setdefault(username, {})
+        changed, dropped = fold_interest(profile.values(), query, float(ts or 0))
+        for term in dropped:
+            del profile[term]
+        for row in changed:
+            profile[row[0]] = row
+    c.executemany(QUERIES["upsert_interest"],
+                  [(username,) + row for username, profile in profiles.items() for row in profile.values()])
+
+DB = Database(DB_FILE, size=int(os.environ.get('DB_POOL_SIZE', '8')))
+
 def init_db():
-    conn = sqlite3.connect(DB_FILE)
-    c = conn.cursor()
-    c.execute('''CREATE TABLE IF NOT EXISTS users
-                 (id INTEGER PRIMARY KEY AUTOINCREMENT,
-                  username TEXT UNIQUE NOT NULL,
-                  password TEXT NOT NULL,
-                  role TEXT DEFAULT 'user')''')
-    c.execute("SELECT * FROM users WHERE username='admin'")
-    if not c.fetchone():
-        c.execute("INSERT INTO users (username, password, role) VALUES (?, ?, ?)", 
-                  ('admin', generate_password_hash('admin123'), 'admin'))
+    with DB.connection() as conn:
+        c = conn.cursor()
+        c.execute('''CREATE TABLE IF NOT EXISTS users
+                     (id INTEGER PRIMARY KEY AUTOINCREMENT,
+                      username TEXT UNIQUE NOT NULL,
+                      password TEXT NOT NULL,
+                      role TEXT DEFAULT 'user')''')
+        c.execute("DROP INDEX IF EXISTS idx_users_username_lower")
+        c.execute("CREATE INDEX IF NOT EXISTS idx_users_username_lower_id ON users (lower(username), id)")
+        c.execute("CREATE INDEX IF NOT EXISTS idx_users_role_id ON users (role, id)")
+
+        # Users per role, kept current by triggers so counting never scans the table
+        c.execute('''CREATE TABLE IF NOT EXISTS user_counts
+                     (role TEXT PRIMARY KEY,
+                      count INTEGER NOT NULL) WITHOUT ROWID''')
+        if not c.execute("SELECT 1 FROM user_counts LIMIT 1").fetchone():
+            c.execute("INSERT INTO user_counts (role, count) SELECT role, COUNT(*) FROM users GROUP BY role")
+        c.execute('''CREATE TRIGGER IF NOT EXISTS users_count_insert AFTER INSERT ON users BEGIN
+                       INSERT INTO user_counts (role, count) VALUES (NEW.role, 1)
+                       ON CONFLICT (role) DO UPDATE SET count = count + 1;
+                     END''')
+        c.execute('''CREATE TRIGGER IF NOT EXISTS users_count_delete AFTER DELETE ON users BEGIN
+                       UPDATE user_counts SET count = count - 1 WHERE role = OLD.role;
+                     END''')
+        c.execute('''CREATE TRIGGER IF NOT EXISTS users_count_role AFTER UPDATE OF role ON users BEGIN
+                       UPDATE user_counts SET count = count - 1 WHERE role = OLD.role;
+                       INSERT INTO user_counts (role, count) VALUES (NEW.role, 1)
+                       ON CONFLICT (role) DO UPDATE SET count = count + 1;
+                     END''')
+        c.execute(QUERIES["user_by_name"], ('admin',))
+        if not c.fetchone():
+            c.execute(QUERIES["insert_user"],
+                      ('admin', generate_password_hash('admin123'), 'admin'))
     
-    # Track search queries for Hybrid Recommendation system
-    c.execute('''CREATE TABLE IF NOT EXISTS user_history
-                 (id INTEGER PRIMARY KEY AUTOINCREMENT,
-                  username TEXT NOT NULL,
-                  query TEXT NOT NULL,
-                  timestamp DATETIME DEFAULT CURRENT_TIMESTAMP)''')
-                  
-    conn.commit()
-    conn.close()
+        # Track search queries for Hybrid Recommendation system
+        c.execute('''CREATE TABLE IF NOT EXISTS user_history
+                     (id INTEGER PRIMARY KEY AUTOINCREMENT,
+                      username TEXT NOT NULL,
+                      query TEXT NOT NULL,
+                      timestamp DATETIME DEFAULT CURRENT_TIMESTAMP)''')
+
+        # Decayed per-term interest weights, updated on every search (see ranking.fold_interest)
+        c.execute('''CREATE TABLE IF NOT EXISTS user_interest
+                     (username TEXT NOT NULL,
+                      term TEXT NOT NULL,
+                      weight REAL NOT NULL,
+                      updated_at REAL NOT NULL,
+                      PRIMARY KEY (username, term)) WITHOUT ROWID''')
+        backfill_user_interest(c)
 
 init_db()
 
-def get_db_connection():
-    conn = sqlite3.connect(DB_FILE)
-    conn.row_factory = sqlite3.Row
-    return conn
+HISTORY_WRITER = HistoryWriter(DB,
+                               flush_interval=float(os.environ.get('HISTORY_FLUSH_INTERVAL', '0.25')),
+                               retention_days=int(os.environ.get('HISTORY_RETENTION_DAYS', '90')))
+atexit.register(HISTORY_WRITER.flush)
+
+# --------------------------
+# SESSION TOKENS
+# --------------------------
+
+# Signed {username, role} tokens issued at login / OTP verify, so later
+# requests are checked with one HMAC instead of a password hash. Set
+# SESSION_SECRET in production; a random one invalidates tokens on restart
+# and is not shared between instances.
+SESSION_SECRET = os.environ.get('SESSION_SECRET') or secrets.token_hex(32)
+SESSION_TOKEN_TTL = int(os.environ.get('SESSION_TOKEN_TTL', str(12 * 3600)))
+SESSION_SIGNER = URLSafeTimedSerializer(SESSION_SECRET, salt='session')
+
+def issue_session_token(username, role):
+    return SESSION_SIGNER.dumps({"username": username, "role": role})
+
+def require_session(role=None):
+    """Route decorator: needs `Authorization: Bearer <token>`, and the given role if any. Sets g.user."""
+    def decorator(view):
+        @functools.wraps(view)
+        def wrapper(*args, **kwargs):
+            token = request.headers.get('Authorization', '')
+            token = token[7:].strip() if token.startswith('Bearer ') else ''
+            if not token:
+                return jsonify({"error": "Avval tizimga kiring"}), 401
+            try:
+                user = SESSION_SIGNER.loads(token, max_age=SESSION_TOKEN_TTL)
+            except SignatureExpired:
+                return jsonify({"error": "Sessiya muddati tugagan. Qaytadan kiring."}), 401
+            except BadSignature:
+                return jsonify({"error": "Sessiya yaroqsiz. Qaytadan kiring."}), 401
+            if role and user.get("role") != role:
+                return jsonify({"error": "Ruxsat yo'q"}), 403
+            g.user = user
+            return view(*args, **kwargs)
+        return wrapper
+    return decorator
+
+# Password hashing (PBKDF2) runs on a few dedicated threads so a login flood
+# queues up there instead of taking CPU from search requests.
+AUTH_WORKERS = int(os.environ.get('AUTH_WORKERS', '2'))
+AUTH_MAX_PENDING = int(os.environ.get('AUTH_MAX_PENDING', '32'))
+AUTH_EXECUTOR = concurrent.futures.ThreadPoolExecutor(max_workers=AUTH_WORKERS, thread_name_prefix='auth')
+AUTH_SLOTS = threading.BoundedSemaphore(AUTH_MAX_PENDING)
+
+class AuthBusy(Exception):
+    pass
+
+def run_password_hash(fn, *args):
+    """Runs generate/check_password_hash on AUTH_EXECUTOR; raises AuthBusy if too many are queued."""
+    if not AUTH_SLOTS.acquire(blocking=False):
+        raise AuthBusy()
+    try:
+        return AUTH_EXECUTOR.submit(fn, *args).result()
+    finally:
+        AUTH_SLOTS.release()
+
+# Per-IP limit on password and OTP attempts (sliding window)
+AUTH_RATE_LIMIT = int(os.environ.get('AUTH_RATE_LIMIT', '10'))
+AUTH_RATE_WINDOW = int(os.environ.get('AUTH_RATE_WINDOW', '60'))
+AUTH_ATTEMPTS = {}  # ip -> deque of attempt times
+AUTH_ATTEMPTS_LOCK = threading.Lock()
+
+# Proxies in front of the app (Vercel's edge is one). Only the X-Forwarded-For entries
+# they appended are trusted; anything earlier in the header is client-supplied.
+TRUSTED_PROXIES = int(os.environ.get('TRUSTED_PROXIES', '1' if os.environ.get('VERCEL') == '1' else '0'))
+if TRUSTED_PROXIES > 0:
+    app.wsgi_app = ProxyFix(app.wsgi_app, x_for=TRUSTED_PROXIES)
+
+def client_ip():
+    return request.remote_addr or ''
+
+def auth_throttled():
+    """Records an attempt from the caller's IP; returns seconds to wait if over the limit, else 0."""
+    now = time.monotonic()
+    with AUTH_ATTEMPTS_LOCK:
+        if len(AUTH_ATTEMPTS) > 10000:
+            # Drop IPs with no attempts in the current window
+            for ip in [ip for ip, times in AUTH_ATTEMPTS.items() if times[-1] <= now - AUTH_RATE_WINDOW]:
+                del AUTH_ATTEMPTS[ip]
+        attempts = AUTH_ATTEMPTS.setdefault(client_ip(), deque())
+        while attempts and attempts[0] <= now - AUTH_RATE_WINDOW:
+            attempts.popleft()
+        if len(attempts) >= AUTH_RATE_LIMIT:
+            return int(attempts[0] + AUTH_RATE_WINDOW - now) + 1
+        attempts.append(now)
+        return 0
+
+def throttled_response(wait):
+    response = jsonify({"error": f"Juda ko'p urinish. {wait} soniyadan keyin qayta urinib ko'ring."})
+    response.headers['Retry-After'] = str(wait)
+    return response, 429
+
+def busy_response():
+    return jsonify({"error": "Server band. Birozdan keyin qayta urinib ko'ring."}), 503
 
 @app.route('/api/register', methods=['POST'])
 def register():
@@ -79,27 +239,33 @@ def register():
     password = data.get('password')
     if not username or not password:
         return jsonify({"error": "Foydalanuvchi nomi va parol kiritilishi shart"}), 400
-    conn = get_db_connection()
+    wait = auth_throttled()
+    if wait:
+        return throttled_response(wait)
     try:
-        conn.execute("INSERT INTO users (username, password) VALUES (?, ?)", 
-                     (username, generate_password_hash(password)))
-        conn.commit()
+        DB.execute("insert_user", (username, run_password_hash(generate_password_hash, password), 'user'))
         return jsonify({"success": "Muvaffaqiyatli ro'yxatdan o'tdingiz"}), 201
     except sqlite3.IntegrityError:
         return jsonify({"error": "Bu nomli foydalanuvchi allaqachon mavjud"}), 400
-    finally:
-        conn.close()
+    except AuthBusy:
+        return busy_response()
 
 @app.route('/api/login', methods=['POST'])
 def login():
     data = request.get_json()
     username = data.get('username')
     password = data.get('password')
-    conn = get_db_connection()
-    user = conn.execute("SELECT * FROM users WHERE username = ?", (username,)).fetchone()
-    conn.close()
-    if user and check_password_hash(user['password'], password):
-        return jsonify({"success": True, "username": user['username'], "role": user['role']})
+    wait = auth_throttled()
+    if wait:
+        return throttled_response(wait)
+    user = DB.one("user_by_name", (username,))
+    try:
+        valid = bool(user) and run_password_hash(check_password_hash, user['password'], password)
+    except AuthBusy:
+        return busy_response()
+    if valid:
+        return jsonify({"success": True, "username": user['username'], "role": user['role'],
+                        "token": issue_session_token(user['username'], user['role'])})
     else:
         return jsonify({"error": "Noto'g'ri logn yoki parol"}), 401
 
@@ -107,15 +273,22 @@ def login():
 # EMAIL OTP AUTHENTICATION
 # --------------------------
 
-# In-memory store for OTPs. Format: { "email@example.com": {"otp": "123456", "expires": timestamp} }
-OTP_STORE = {}
+# OTP codes by email: 'sqlite' (shared by all workers using the same DB file) or 'memory' (one process)
+OTP_STORE = make_otp_store(os.environ.get('OTP_STORE', 'sqlite'), DB,
+                           sweep_interval=int(os.environ.get('OTP_SWEEP_INTERVAL', '60')))
 
 # Email settings (Placeholder or App Password configurations loaded from .env)
-MAIL_SERVER = 'smtp.gmail.com'
-MAIL_PORT = 465
+MAIL_SERVER = os.environ.get('MAIL_SERVER', 'smtp.gmail.com')
+MAIL_PORT = int(os.environ.get('MAIL_PORT', '465'))
+MAIL_USE_SSL = os.environ.get('MAIL_USE_SSL', '1') != '0'
 MAIL_USERNAME = os.environ.get('MAIL_USERNAME', '').strip()
 MAIL_PASSWORD = os.environ.get('MAIL_PASSWORD', '').replace(' ', '') # remove spaces if any
 
+# OTP emails are sent in the background over one kept-alive SMTP connection
+MAILER = MailQueue(MAIL_SERVER, MAIL_PORT, MAIL_USERNAME, MAIL_PASSWORD, use_ssl=MAIL_USE_SSL,
+                   idle_timeout=int(os.environ.get('MAIL_IDLE_TIMEOUT', '60')))
+atexit.register(MAILER.flush, 10)
+
 def send_otp_via_email(to_email, otp_code):
     try:
         # If credentials are provided and not placeholders, try to actually send the email
@@ -127,10 +300,8 @@ def send_otp_via_email(to_email, otp_code):
             msg['From'] = f"Antigravity Tizimi <{MAIL_USERNAME}>"
             msg['To'] = to_email
             
-            with smtplib.SMTP_SSL(MAIL_SERVER, MAIL_PORT) as server:
-                server.login(MAIL_USERNAME, MAIL_PASSWORD)
-                server.send_message(msg)
-            print(f"✅ OTP email orqali muvaffaqiyatli jo'natildi: {to_email}")
+            MAILER.send(msg)
+            print(f"✅ OTP email navbatga qo'yildi: {to_email}")
             return True
         else:
             # For development without credentials, just print it to the console
@@ -152,14 +323,14 @@ def send_otp():
     
     if not email or '@' not in email:
         return jsonify({"error": "Yaroqli email manzilini kiriting"}), 400
+    wait = auth_throttled()
+    if wait:
+        return throttled_response(wait)
         
     otp_code = str(random.randint(100000, 999999))
     expires = time.time() + 300 # 5 minutes expiration
     
-    OTP_STORE[email] = {
-        "otp": otp_code,
-        "expires": expires
-    }
+    OTP_STORE.put(email, otp_code, expires)
     
     # Send email (or print to console if no credentials)
     send_otp_via_email(email, otp_code)
@@ -182,6 +353,9 @@ def verify_otp():
     
     if not email or not otp_input:
         return jsonify({"error": "Email va OTP kod kiritilishi shart"}), 400
+    wait = auth_throttled()
+    if wait:
+        return throttled_response(wait)
         
     stored_data = OTP_STORE.get(email)
     
@@ -189,51 +363,149 @@ def verify_otp():
         return jsonify({"error": "Bu email uchun kod so'ralmagan yoki vaqti o'tib ketgan."}), 400
         
     if time.time() > stored_data['expires']:
-        del OTP_STORE[email]
+        OTP_STORE.delete(email)
         return jsonify({"error": "Kodning vaqti (5 daqiqa) tugagan. Yangi kod so'rang."}), 400
         
     if stored_data['otp'] != otp_input:
         return jsonify({"error": "Kod noto'g'ri."}), 401
         
-    # Code is valid! Clear it
-    del OTP_STORE[email]
-    
     # Log the user in or auto-register them
-    conn = get_db_connection()
-    user = conn.execute("SELECT * FROM users WHERE username = ?", (email,)).fetchone()
+    user = DB.one("user_by_name", (email,))
     
     if not user:
         # Auto-register
-        import secrets
         dummy_pw = secrets.token_hex(16)
-        conn.execute("INSERT INTO users (username, password, role) VALUES (?, ?, ?)", 
-                     (email, generate_password_hash(dummy_pw), 'user'))
-        conn.commit()
+        try:
+            DB.execute("insert_user", (email, run_password_hash(generate_password_hash, dummy_pw), 'user'))
+        except sqlite3.IntegrityError:
+            pass  # registered by a concurrent verify of the same email
+        except AuthBusy:
+            return busy_response()  # the code stays valid, so the user can simply retry
         user_role = 'user'
     else:
         user_role = user['role']
-        
-    conn.close()
     
-    return jsonify({"success": True, "username": email, "role": user_role}), 200
+    # Code is valid! Clear it
+    OTP_STORE.delete(email)
+    
+    return jsonify({"success": True, "username": email, "role": user_role,
+                    "token": issue_session_token(email, user_role)}), 200
+
+ADMIN_USERS_PAGE = 50
+ADMIN_USERS_MAX_PAGE = 200
+
+def username_prefix_range(prefix):
+    """[low, high) bounds on lower(username) for a prefix, so the lookup is an index range scan."""
+    low = prefix.lower()
+    return low, low[:-1] + chr(ord(low[-1]) + 1)
 
 @app.route('/api/admin/users', methods=['GET'])
+@require_session('admin')
 def get_users():
-    conn = get_db_connection()
-    users = conn.execute("SELECT id, username, role FROM users").fetchall()
-    conn.close()
-    return jsonify({"users": [dict(u) for u in users]})
+    """One page of users. Params: after_id (the previous next_after_id), limit, q (username prefix), role.
+
+    Pages are ordered by id, or by (lower(username), id) with a prefix; then
+    after_name (the previous next_after_name) goes with after_id.
+    """
+    try:
+        after_id = int(request.args.get('after_id', 0))
+        limit = max(1, min(int(request.args.get('limit', ADMIN_USERS_PAGE)), ADMIN_USERS_MAX_PAGE))
+    except ValueError:
+        return jsonify({"error": "after_id va limit butun son bo'lishi kerak"}), 400
+    prefix = request.args.get('q', '').strip()
+    role = request.args.get('role', '').strip()
+
+    if prefix:
+        # The cursor is the index range's lower bound, never below the prefix itself
+        low, high = username_prefix_range(prefix)
+        after_name, after_id = max((request.args.get('after_name', low), after_id), (low, 0))
+        keyset = (after_name, high, after_name, after_id)
+    if prefix and role:
+        users = DB.all("users_page_prefix_role", keyset + (role, limit))
+    elif prefix:
+        users = DB.all("users_page_prefix", keyset + (limit,))
+    elif role:
+        users = DB.all("users_page_role", (role, after_id, limit))
+    else:
+        users = DB.all("users_page", (after_id, limit))
+    page = {"users": [{k: u[k] for k in ('id', 'username', 'role')} for u in users],
+            "next_after_id": users[-1]['id'] if len(users) == limit else None}
+    if prefix and page["next_after_id"] is not None:
+        # SQLite's lower(), not str.lower(): they differ outside ASCII
+        page["next_after_name"] = users[-1]['name_key']
+    return jsonify(page)
+
+@app.route('/api/admin/users/count', methods=['GET'])
+@require_session('admin')
+def count_users():
+    """Total users and users per role; with q, users whose name starts with it (counted on the index)."""
+    prefix = request.args.get('q', '').strip()
+    role = request.args.get('role', '').strip()
+    if prefix:
+        if role:
+            total = DB.one("count_users_prefix_role", username_prefix_range(prefix) + (role,))[0]
+        else:
+            total = DB.one("count_users_prefix", username_prefix_range(prefix))[0]
+        return jsonify({"total": total})
+    by_role = {r['role']: r['count'] for r in DB.all("user_counts")}
+    total = by_role.get(role, 0) if role else sum(by_role.values())
+    return jsonify({"total": total, "by_role": by_role})
+
+@app.route('/api/admin/translation-cache', methods=['GET'])
+@require_session('admin')
+def get_translation_cache_stats():
+    return jsonify(TRANSLATOR.stats())
+
+@app.route('/api/admin/citation-store', methods=['GET'])
+@require_session('admin')
+def get_citation_store_stats():
+    return jsonify(dict(CITATION_STORE.stats, **CITATION_STORE.counts()))
+
+@app.route('/api/admin/graph-layout', methods=['GET'])
+@require_session('admin')
+def get_graph_layout_stats():
+    return jsonify(dict(LAYOUT_CACHE.stats, entries=len(LAYOUT_CACHE)))
+
+@app.route('/api/admin/mail-queue', methods=['GET'])
+@require_session('admin')
+def get_mail_queue_stats():
+    return jsonify(dict(MAILER.stats, depth=MAILER.depth()))
 
 @app.route('/api/admin/users/<int:user_id>', methods=['DELETE'])
+@require_session('admin')
 def delete_user(user_id):
-    conn = get_db_connection()
-    conn.execute("DELETE FROM users WHERE id = ?", (user_id,))
-    conn.commit()
-    conn.close()
+    DB.execute("delete_user", (user_id,))
     return jsonify({"success": "Foydalanuvchi o'chirildi"})
 
 OPENALEX_API_URL = "https://api.openalex.org"
 
+# Root-level work fields each OpenAlex request actually reads, sent as `select=`
+# so OpenAlex skips the inverted abstract, locations, full concept lists etc.
+# (/autocomplete does not support select.)
+OPENALEX_SELECT = {
+    "search": ["id", "title", "publication_year", "cited_by_count", "relevance_score",
+               "open_access", "concepts", "authorships"],
+    "paper": ["id", "title", "publication_year", "cited_by_count", "authorships", "referenced_works"],
+    "graph": ["id", "title", "publication_year", "cited_by_count", "authorships", "referenced_works"],
+}
+
+def openalex_url(url, endpoint):
+    """Adds the endpoint's `select=` projection to an OpenAlex URL."""
+    fields = OPENALEX_SELECT.get(endpoint)
+    if not fields:
+        return url
+    return url + ("&" if "?" in url else "?") + "select=" + ",".join(fields)
+
+def openalex_get(url, endpoint):
+    response = http_client.get(openalex_url(url, endpoint))
+    if (response.status_code == 400 and endpoint in OPENALEX_SELECT
+            and 'select' in response.text.lower()):
+        # A field OpenAlex no longer accepts in select must not break the feature;
+        # other 400s (e.g. a bad user filter) would fail again, so don't retry them
+        print(f"OpenAlex rejected select for '{endpoint}', retrying without it")
+        response = http_client.get(url)
+    return response
+
 AUTHOR_ALIASES = {
     "abdulla qodiriy": ["julqunboy", "dumbul", "ovsar", "obid ketmon", "shig'ayboy"],
     "alisher navoiy": ["foniy", "navoiy"],
@@ -369,7 +641,7 @@ def get_wikipedia_summary(author_name):
     # Try UZ first
     uz_wiki_url = f"https://uz.wikipedia.org/api/rest_v1/page/summary/{author_name.title()}"
     try:
-        resp = requests.get(uz_wiki_url, headers=headers, timeout=3)
+        resp = http_client.get(uz_wiki_url, headers=headers)
         if resp.status_code == 200:
             extract = resp.json().get('extract')
             if extract:
@@ -380,7 +652,7 @@ def get_wikipedia_summary(author_name):
     # Fallback to EN and translate
     en_wiki_url = f"https://en.wikipedia.org/api/rest_v1/page/summary/{author_name.title()}"
     try:
-        resp = requests.get(en_wiki_url, headers=headers, timeout=3)
+        resp = http_client.get(en_wiki_url, headers=headers)
         if resp.status_code == 200:
             extract_en = resp.json().get('extract')
             if extract_en:
@@ -390,12 +662,12 @@ def get_wikipedia_summary(author_name):
         
     return None
 
+# Translations are cached by (text, target language) in a SQLite file next to DB_FILE
+TRANSLATOR = CachedTranslator(os.path.join(os.path.dirname(DB_FILE), "translation_cache.db"))
+
 def safe_translate(text, tgt_lang):
     if not text: return ""
-    try:
-        return GoogleTranslator(source='auto', target=tgt_lang).translate(text)
-    except Exception:
-        return text
+    return TRANSLATOR.translate(text, tgt_lang)
 
 def get_cyberleninka_results(query, max_results=5):
     """Fetch search results from CyberLeninka."""
@@ -405,7 +677,7 @@ def get_cyberleninka_results(query, max_results=5):
     }
     
     try:
-        response = requests.get(url, headers=headers, timeout=5)
+        response = http_client.get(url, headers=headers)
         if response.status_code != 200:
             return []
             
@@ -446,15 +718,13 @@ def get_google_books_results(query, max_results=10):
     """Fetch books matching the query from Google Books API."""
     url = f"https://www.googleapis.com/books/v1/volumes?q={query}&maxResults={max_results}"
     try:
-        response = requests.get(url, timeout=5)
+        response = http_client.get(url)
         if response.status_code == 200:
             items = response.json().get('items', [])
             books = []
             for item in items:
                 vol = item.get('volumeInfo', {})
                 original_title = vol.get('title', 'Noma\'lum Kitob')
-                # Translate book title to Uzbek
-                uz_title = safe_translate(original_title, 'uz')
                 
                 authors = vol.get('authors', ['Noma\'lum'])
                 year = vol.get('publishedDate', 'YYYY')[:4]
@@ -462,7 +732,7 @@ def get_google_books_results(query, max_results=10):
                 
                 books.append({
                     "id": f"gbooks_{item.get('id')}",
-                    "title": uz_title,
+                    "title": original_title,  # Translated together with the other results
                     "original_title": original_title,
                     "publication_year": year,
                     "cited_by_count": 0, # Books API doesn't return citations easily here
@@ -482,163 +752,79 @@ def suggest_papers():
         return jsonify({"results": []})
         
     api_url = f"{OPENALEX_API_URL}/autocomplete/works?q={query}"
-    response = requests.get(api_url)
+    response = http_client.get(api_url)
     if response.status_code == 200:
         return jsonify(response.json())
     return jsonify({"results": []})
 
-import re
+# Tables are compiled once in translit.py; kept under the old name for existing callers
+uz_transliterate = transliterate
 
-def normalize_text(text):
-    if type(text) is not str:
-        text = str(text)
-    # Lowercase and remove multiple spaces
-    text = text.lower().strip()
-    text = re.sub(r'\s+', ' ', text)
-    # Strip punctuation except alphanumeric and spaces
-    text = re.sub(r'[^\w\s]', '', text)
-    return text
-
-def letter_normalize(text):
-    if type(text) is not str: text = str(text)
-    t = text.lower()
-    t = t.replace("x", "h").replace("х", "ҳ").replace("ҳ", "х")
-    t = t.replace("q", "k").replace("қ", "к")
-    t = t.replace("o'", "o").replace("o‘", "o").replace("o’", "o").replace("o`", "o").replace("ў", "о")
-    t = t.replace("g'", "g").replace("g‘", "g").replace("g’", "g").replace("g`", "g").replace("ғ", "г")
-    return t
+# --------------------------
+# SEARCH FAN-OUT
+# --------------------------
 
-def is_exact_word(query, text):
-    if not query or not text: return False
-    return bool(re.search(r'\b' + re.escape(query) + r'\b', text))
-
-SYNONYMS = {
-    "kitob": "book", "book": "kitob",
-    "dasturlash": "programming", "programming": "dasturlash",
-    "suniy intellekt": "ai", "ai": "suniy intellekt", "artificial intelligence": "suniy intellekt",
-    "o'qituvchi": "teacher", "teacher": "o'qituvchi",
-    "iqtisodiyot": "economics", "economics": "iqtisodiyot",
-    "tibbiyot": "medicine", "medicine": "tibbiyot",
-    "falsafa": "philosophy", "philosophy": "falsafa",
-    "san'at": "art", "art": "san'at",
-    "talim": "education", "education": "talim",
-    "huquq": "law", "law": "huquq",
-    "texnologiya": "technology", "technology": "texnologiya"
-}
+# Per-request time budget (seconds) shared by every upstream call of one search
+SEARCH_BUDGET = float(os.environ.get('SEARCH_BUDGET', '8'))
+# Query expansion has to leave time for the OpenAlex request that depends on it
+EXPANSION_BUDGET = float(os.environ.get('SEARCH_EXPANSION_BUDGET', '2.5'))
 
-def uz_transliterate(text):
-    if not text: return text
-    
-    l2c = {
-        "sh": "ш", "ch": "ч", "ya": "я", "yo": "ё", "yu": "ю", "o'": "ў", "g'": "ғ",
-        "shch": "щ",
-        "a": "а", "b": "б", "d": "д", "e": "е", "f": "ф", "g": "г", "h": "ҳ",
-        "i": "и", "j": "ж", "k": "к", "l": "л", "m": "м", "n": "н", "o": "о",
-        "p": "п", "q": "қ", "r": "р", "s": "с", "t": "т", "u": "у", "v": "в",
-        "x": "х", "y": "й", "z": "з", "c": "ц",
-        "SH": "Ш", "CH": "Ч", "YA": "Я", "YO": "Ё", "YU": "Ю", "O'": "Ў", "G'": "Ғ",
-        "A": "А", "B": "Б", "D": "Д", "E": "Е", "F": "Ф", "G": "Г", "H": "Ҳ",
-        "I": "И", "J": "Ж", "K": "К", "L": "Л", "M": "М", "N": "Н", "O": "О",
-        "P": "П", "Q": "Қ", "R": "Р", "S": "С", "T": "Т", "U": "У", "V": "В",
-        "X": "Х", "Y": "Й", "Z": "З", "C": "Ц", "'": "ъ"
-    }
-    c2l = {v: k for k, v in l2c.items()}
-    # Hardcoded fixes for some edge cases
-    c2l['э'] = 'e'
-    c2l['Э'] = 'E'
-    c2l['ы'] = 'y'
-    c2l['Ы'] = 'Y'
-    
-    is_cyrillic = any('\u0400' <= char <= '\u04FF' for char in text)
-    res = text
-    
-    if is_cyrillic:
-        # Cyrillic to Latin
-        # Single characters are fine to replace mapping iteration
-        for cyr, lat in sorted(c2l.items(), key=lambda x: len(x[0]), reverse=True):
-            res = res.replace(cyr, lat)
-    else:
-        # Latin to Cyrillic
-        for lat, cyr in sorted(l2c.items(), key=lambda x: len(x[0]), reverse=True):
-            res = res.replace(lat, cyr)
-            
-    return res
+# Long-lived pool so calls that miss the deadline never block the response
+UPSTREAM_EXECUTOR = concurrent.futures.ThreadPoolExecutor(max_workers=32, thread_name_prefix='upstream')
 
-@app.route('/api/search', methods=['GET'])
-def search_papers():
-    query = request.args.get('q', '').strip()
-    username = request.args.get('username', '').strip()
-    year_start = request.args.get('year_start', '')
-    year_end = request.args.get('year_end', '')
-    authors = request.args.get('authors', '').strip()
-    journals = request.args.get('journals', '').strip()
-    lang = request.args.get('lang', '')
-    min_citations = request.args.get('min_cites', '')
-    max_citations = request.args.get('max_cites', '')
-    work_type = request.args.get('work_type', '').strip()
-    
-    user_past_queries = []
-    if query and username:
-        conn = get_db_connection()
+class SearchFanout:
+    """Starts independent upstream calls at once and collects them against one deadline.
+
+    Calls that miss the deadline or raise are recorded in `skipped`, so the
+    response can tell the client which sources were left out.
+    """
+
+    def __init__(self, budget=None):
+        self.deadline = time.monotonic() + (SEARCH_BUDGET if budget is None else budget)
+        self.futures = {}
+        self.skipped = []
+
+    def start(self, name, fn, *args):
+        self.start_on(UPSTREAM_EXECUTOR, name, fn, *args)
+
+    def start_on(self, executor, name, fn, *args):
+        """start() on another pool, e.g. one sized to cap a request's concurrency."""
+        self.futures[name] = executor.submit(self._within_deadline, fn, *args)
+
+    def _within_deadline(self, fn, *args):
+        # Upstream timeouts and retries are cut to what is left of the budget
+        with http_client.deadline(self.deadline):
+            return fn(*args)
+
+    def remaining(self):
+        return max(0.0, self.deadline - time.monotonic())
+
+    def _skip(self, name, reason):
+        if name not in self.skipped:
+            print(f"Search fan-out: '{name}' left out ({reason})")
+            self.skipped.append(name)
+
+    def result(self, name, default=None, timeout=None):
+        future = self.futures.get(name)
+        if future is None:
+            return default
+        wait = self.remaining() if timeout is None else min(timeout, self.remaining())
         try:
-            conn.execute("INSERT INTO user_history (username, query) VALUES (?, ?)", (username, query))
-            conn.commit()
-            history = conn.execute("SELECT query FROM user_history WHERE username = ? ORDER BY timestamp DESC LIMIT 20", (username,)).fetchall()
-            user_past_queries = [h['query'].lower() for h in history]
+            return future.result(timeout=wait)
+        except concurrent.futures.TimeoutError:
+            future.cancel()
+            self._skip(name, "deadline")
         except Exception as e:
-            print(f"History tracking error: {e}")
-        finally:
-            conn.close()
+            self._skip(name, e)
+        return default
 
-    # Expand query intelligently
-    q_expanded = ""
-    author_profile = None
+    def drop(self, name):
+        """Abandons a speculative call that turned out not to be needed."""
+        future = self.futures.pop(name, None)
+        if future is not None:
+            future.cancel()
 
-    if query:
-        # 1. Always check Wikipedia first to see if it's a known entity
-        wiki_bio = get_wikipedia_summary(query)
-        
-        # 2. Check pseudonyms
-        canonical_author, aliases = resolve_author_info(query)
-        
-        if canonical_author:
-            # We found a hardcoded pseudonym match
-            search_terms = [canonical_author] + aliases
-            terms_str = " OR ".join([f'"{t}"' for t in search_terms])
-            q_expanded = terms_str 
-            
-            # If wiki didn't find the exact query, try the canonical name
-            if not wiki_bio:
-                wiki_bio = get_wikipedia_summary(canonical_author)
-                
-            author_profile = {
-                "name": canonical_author.title(),
-                "aliases": [a.title() for a in aliases],
-                "bio": wiki_bio or "Ma'lumot topilmadi."
-            }
-        else:
-            # Not a hardcoded pseudonym. 
-            # Standard translation expansion for openalex
-            q_en = safe_translate(query, 'en')
-            q_ru = safe_translate(query, 'ru')
-            q_translit = uz_transliterate(query)
-            
-            terms = [f'"{query}"']
-            if q_en and q_en.lower() != query.lower(): terms.append(f'"{q_en}"')
-            if q_ru and q_ru.lower() != query.lower(): terms.append(f'"{q_ru}"')
-            if q_translit and q_translit.lower() != query.lower(): terms.append(f'"{q_translit}"')
-            
-            q_expanded = " OR ".join(terms)
-            
-            # If Wikipedia had something for this random query, show universal knowledge card
-            if wiki_bio:
-                author_profile = {
-                    "name": query.title(),
-                    "aliases": [],
-                    "bio": wiki_bio
-                }
-
-    # Build exact filters
+def build_search_filters(year_start, year_end, lang, authors, journals, min_citations, max_citations, work_type):
     filters = []
     if year_start and year_end:
         filters.append(f"publication_year:{year_start}-{year_end}")
@@ -646,232 +832,890 @@ def search_papers():
         filters.append(f"publication_year:{year_start}-")
     elif year_end:
         filters.append(f"publication_year:-{year_end}")
-        
+
     if lang:
         filters.append(f"language:{lang}")
-        
+
     if authors:
         filters.append(f"authorships.author.display_name.search:{authors}")
-        
+
     if journals:
         filters.append(f"primary_location.source.display_name.search:{journals}")
-        
+
     if min_citations and max_citations:
         filters.append(f"cited_by_count:{min_citations}-{max_citations}")
     elif min_citations:
         filters.append(f"cited_by_count:>{min_citations}")
     elif max_citations:
         filters.append(f"cited_by_count:<{max_citations}")
-        
+
     if work_type:
         filters.append(f"type:{work_type}")
-        
-    filter_string = ",".join(filters)
-        
-    api_url = f"{OPENALEX_API_URL}/works?per-page=40"
+
+    return ",".join(filters)
+
+OPENALEX_PAGE_SIZE = 40
+
+# Optional local FTS5 index built with `python openalex_index.py ingest ...`.
+# Searches with local=1 (or every search when SEARCH_LOCAL_MODE=1) are answered
+# from it and only go to the API when the index has no match.
+OPENALEX_INDEX_FILE = os.environ.get('OPENALEX_INDEX_FILE',
+                                     os.path.join(os.path.dirname(os.path.abspath(__file__)), "openalex_index.db"))
+OPENALEX_INDEX = OpenAlexIndex(OPENALEX_INDEX_FILE) if os.path.exists(OPENALEX_INDEX_FILE) else None
+SEARCH_LOCAL_MODE = os.environ.get('SEARCH_LOCAL_MODE') == '1'
+
+def fetch_openalex_works(q_expanded, filter_string, cursor="*"):
+    """One page of /works; `cursor` is "*" for the first page, then the previous page's meta.next_cursor."""
+    api_url = f"{OPENALEX_API_URL}/works?per-page={OPENALEX_PAGE_SIZE}&cursor={urllib.parse.quote(cursor)}"
     if q_expanded:
         api_url += f"&search={q_expanded}"
     if filter_string:
         api_url += f"&filter={filter_string}"
-        
-    if not q_expanded and not filter_string and not authors and not journals:
-        return jsonify({"error": "Iltimos qidiruv mezoni kiriting"}), 400
+    return openalex_get(api_url, "search")
+
+def process_work(work):
+    """Maps an OpenAlex work to our result schema. The title is translated later, in bulk."""
+    original_title = work.get("title") or "Untitled"
+
+    oa_url = None
+    if work.get("open_access", {}).get("is_oa"):
+        oa_url = work.get("open_access", {}).get("oa_url")
+
+    concepts = [c.get("display_name", "") for c in work.get("concepts", [])[:5]]
+
+    return {
+        "id": work.get("id"),
+        "title": str(original_title),
+        "original_title": str(original_title),
+        "description": "", # OpenAlex abstract comes inverted, skip for brevity, rely on title/concepts
+        "tags": concepts,
+        "publication_year": work.get("publication_year"),
+        "cited_by_count": work.get("cited_by_count", 0),
+        "relevance_score": float(work.get("relevance_score") or 0),
+        "authors": [author.get("author", {}).get("display_name") for author in work.get("authorships", [])],
+        "download_url": oa_url,
+        "source": "OpenAlex"
+    }
 
-    response = requests.get(api_url)
-    
-    if response.status_code == 200:
-        data = response.json()
-        results = []
-        
-        def process_work(work):
-            original_title = work.get("title") or "Untitled"
-            uz_title = safe_translate(original_title, 'uz')
-            
-            oa_url = None
-            if work.get("open_access", {}).get("is_oa"):
-                oa_url = work.get("open_access", {}).get("oa_url")
-                
-            concepts = [c.get("display_name", "") for c in work.get("concepts", [])[:5]]
-            
-            return {
-                "id": work.get("id"),
-                "title": uz_title,
-                "original_title": str(original_title),
-                "description": "", # OpenAlex abstract comes inverted, skip for brevity, rely on title/concepts
-                "tags": concepts,
-                "publication_year": work.get("publication_year"),
-                "cited_by_count": work.get("cited_by_count", 0),
-                "relevance_score": float(work.get("relevance_score") or 0),
-                "authors": [author.get("author", {}).get("display_name") for author in work.get("authorships", [])],
-                "download_url": oa_url,
-                "source": "OpenAlex"
-            }
+def translate_titles(results, fanout):
+    """Translates all result titles to Uzbek in one cached batch. On a missed deadline titles stay original."""
+    fanout.start('title_translation', TRANSLATOR.translate_many, [r['original_title'] for r in results], 'uz')
+    titles = fanout.result('title_translation', default=[])
+    for r, uz_title in zip(results, titles):
+        if uz_title:
+            r['title'] = uz_title
+
+def search_stages(query, filter_string, authors, journals, local_filters=None):
+    """Runs the upstream chain for one query, yielding (stage, payload) as each part is ready.
+
+    Stages come in this order: "author_profile", "results" for OpenAlex
+    (titles not yet translated), "results" for CyberLeninka / Google Books,
+    "titles" (id -> Uzbek title) and finally "candidates" with everything.
+    An OpenAlex error ends the chain with an "error" stage instead.
+    With `local_filters` the works come from the local OpenAlex index, and
+    the API is only asked when the index has no match.
+    """
+    # Start every upstream call that only depends on the raw query right away
+    fanout = SearchFanout()
+    canonical_author, aliases = resolve_author_info(query) if query else (None, [])
+    if query:
+        fanout.start('wikipedia', get_wikipedia_summary, query)
+        if canonical_author:
+            # Only needed if the exact query has no article, but cheaper to ask now than after
+            fanout.start('wikipedia_canonical', get_wikipedia_summary, canonical_author)
+        else:
+            fanout.start('translate_en', safe_translate, query, 'en')
+            fanout.start('translate_ru', safe_translate, query, 'ru')
+        fanout.start('cyberleninka', get_cyberleninka_results, query)
+        if not (authors or journals):
+            # Speculative: dropped below when OpenAlex and CyberLeninka already return enough
+            fanout.start('google_books', get_google_books_results, query)
 
-        with concurrent.futures.ThreadPoolExecutor(max_workers=10) as executor:
-            works = data.get('results', [])
-            results = list(executor.map(process_work, works))
+    # Expand query intelligently
+    search_terms = []
+    if query:
+        if canonical_author:
+            # We found a hardcoded pseudonym match
+            search_terms = [canonical_author] + aliases
+        else:
+            # Standard translation expansion for openalex
+            q_en = fanout.result('translate_en', timeout=EXPANSION_BUDGET)
+            q_ru = fanout.result('translate_ru', timeout=EXPANSION_BUDGET)
+            q_translit = uz_transliterate(query)
 
-        cyber_results = get_cyberleninka_results(query)
-        if cyber_results:
-             for cr in cyber_results:
-                 cr['title'] = safe_translate(cr['original_title'], 'uz')
-                 cr['relevance_score'] = 100.0 if query.lower() in str(cr['original_title']).lower() else 50.0
-             results.extend(cyber_results)
-             
-        if len(results) <= 3 and not (authors or journals):
-            books = get_google_books_results(query)
-            for b in books:
-                b['relevance_score'] = 80.0 if query.lower() in str(b['original_title']).lower() else 40.0
-            results.extend(books)
-
-        # Hybrid Recommendation Ranking
-        max_cites = max([int(r.get('cited_by_count') or 0) for r in results] + [1])
-        max_rel = max([float(r.get('relevance_score') or 0) for r in results] + [1.0])
-        
-        exact_matches = []
-        related_results = []
-        recommended = []
-        
-        # NLP Base Prep
-        q_norm = normalize_text(query)
-        q_translit = normalize_text(uz_transliterate(query))
-        q_letter_norm = letter_normalize(q_translit)
-        q_words = set(q_norm.split())
-        q_synonyms = set()
-        for w in q_words:
-            if w in SYNONYMS:
-                q_synonyms.add(SYNONYMS[w])
-        
-        for r in results:
-            t_orig = r.get("original_title", "")
-            d_orig = r.get("description", "")
-            
-            t_norm = normalize_text(t_orig)
-            d_norm = normalize_text(d_orig)
-            tags_orig = r.get("tags", [])
-            
-            nlp_score = 0
-            reasons = []
-            
-            def check_match(text, weight_name, multiplier):
-                nonlocal nlp_score
-                if not text: return
-                
-                text_norm = normalize_text(text)
-                text_lat = normalize_text(uz_transliterate(text))
-                text_let_norm = letter_normalize(text_lat)
-                
-                # Exact script word match
-                if is_exact_word(q_norm, text_norm):
-                    nlp_score += 5 * multiplier
-                    reasons.append(f"Exact match (+5) in {weight_name}")
-                # Translit word match
-                elif is_exact_word(q_translit, text_lat) and q_translit != q_norm:
-                    nlp_score += 4 * multiplier
-                    reasons.append(f"Translit match (+4) in {weight_name}")
-                # Phonetic/Normalized word match
-                elif is_exact_word(q_letter_norm, text_let_norm) and q_letter_norm != q_translit:
-                    nlp_score += 4 * multiplier
-                    reasons.append(f"Normalized match (+4) in {weight_name}")
-                # Synonyms
-                else:
-                    syn_matched = False
-                    for syn in q_synonyms:
-                        if is_exact_word(syn, text_norm) or is_exact_word(syn, text_lat):
-                            nlp_score += 3 * multiplier
-                            reasons.append(f"Synonym '{syn}' (+3) in {weight_name}")
-                            syn_matched = True
-                            break
-                    # Partial
-                    if not syn_matched:
-                        for w in q_words:
-                            if len(w) > 3 and (w in text_norm or w in text_lat or letter_normalize(w) in text_let_norm):
-                                nlp_score += 2 * multiplier
-                                reasons.append(f"Partial '{w}' (+2) in {weight_name}")
-                                break
-                                
-            check_match(t_orig, "Title", 3)
-            check_match(d_orig, "Description", 2)
-            for tag in tags_orig:
-                check_match(tag, "Tags", 1)
-                
-            # Filter repeated reasons
-            unique_reasons = []
-            for reason in reasons:
-                if reason not in unique_reasons: unique_reasons.append(reason)
-                
-            r["match_reason"] = " | ".join(unique_reasons) if unique_reasons else "Semantic vector API fallback"
-            r["nlp_score"] = nlp_score
-            
-            # Blend into hybrid API score
-            api_rel = float(r.get("relevance_score") or 0) / max_rel
-            norm_nlp = min(1.0, nlp_score / 15.0)
-            final_rel = max(api_rel, norm_nlp)
-            
-            pop = float(r.get("cited_by_count", 0) or 0) / max_cites
-            
-            year = r.get("publication_year")
-            if not str(year).isdigit(): year = 2000
-            year = int(year)
-            rec = max(0, min(1, (year - 1950) / 75.0))
-            
-            u_int = 0
-            for pq in user_past_queries:
-                if normalize_text(pq) in t_norm or normalize_text(pq) in q_norm:
-                    u_int += 0.2
-            u_int = min(1.0, u_int)
-            
-            final_score = (0.5 * final_rel) + (0.2 * pop) + (0.2 * rec) + (0.1 * u_int)
-            r["hybrid_score"] = float(f"{final_score:.3f}")
-            r["score"] = r["hybrid_score"] # Explicit score key mapping as requested
-            
-            if nlp_score >= 15 or final_rel > 0.85 or (q_norm and q_norm == t_norm):
-                exact_matches.append(r)
-            elif nlp_score > 0 or final_rel > 0.4:
-                related_results.append(r)
+            search_terms = [query]
+            if q_en and q_en.lower() != query.lower(): search_terms.append(q_en)
+            if q_ru and q_ru.lower() != query.lower(): search_terms.append(q_ru)
+            if q_translit and q_translit.lower() != query.lower(): search_terms.append(q_translit)
+    q_expanded = " OR ".join([f'"{t}"' for t in search_terms])
+
+    local_works = None
+    if local_filters is not None and search_terms:
+        local_works = OPENALEX_INDEX.search(search_terms, **local_filters) or None
+    if local_works is None:
+        fanout.start('openalex', fetch_openalex_works, q_expanded, filter_string)
+
+    author_profile = None
+    if query:
+        # Wikipedia tells us whether the query is a known entity
+        wiki_bio = fanout.result('wikipedia')
+        if canonical_author:
+            # If wiki didn't find the exact query, try the canonical name
+            if not wiki_bio:
+                wiki_bio = fanout.result('wikipedia_canonical')
             else:
-                recommended.append(r)
-                
-        exact_matches.sort(key=lambda x: x["hybrid_score"], reverse=True)
-        related_results.sort(key=lambda x: x["hybrid_score"], reverse=True)
-        recommended.sort(key=lambda x: x["hybrid_score"], reverse=True)
-        
-        if not recommended and len(related_results) > 6:
-            split_idx = len(related_results) // 2
-            recommended = related_results[split_idx:]
-            related_results = related_results[:split_idx]
-            
-        if not related_results and len(recommended) > 6:
-            split_idx = len(recommended) // 2
-            related_results = recommended[:split_idx]
-            recommended = recommended[split_idx:]
+                fanout.drop('wikipedia_canonical')
+            author_profile = {
+                "name": canonical_author.title(),
+                "aliases": [a.title() for a in aliases],
+                "bio": wiki_bio or "Ma'lumot topilmadi."
+            }
+        elif wiki_bio:
+            # If Wikipedia had something for this random query, show universal knowledge card
+            author_profile = {
+                "name": query.title(),
+                "aliases": [],
+                "bio": wiki_bio
+            }
+    yield "author_profile", author_profile
 
-        return jsonify({
-            "exact_matches": exact_matches,
-            "related_results": related_results,
-            "recommended": recommended,
-            "author_profile": author_profile
-        })
+    if local_works is not None:
+        data = {"results": local_works, "meta": {}}
     else:
+        response = fanout.result('openalex')
+        if response is not None and response.status_code != 200:
+            print(f"OpenAlex error: HTTP {response.status_code}")
+            yield "error", "Failed to fetch data from OpenAlex"
+            return
+        data = response.json() if response is not None else {}
+    results = [process_work(work) for work in data.get('results', [])]
+    yield "results", {"source": "OpenAlex", "results": results}
+
+    cyber_results = fanout.result('cyberleninka', default=[])
+    for cr in cyber_results:
+        cr['relevance_score'] = 100.0 if query.lower() in str(cr['original_title']).lower() else 50.0
+    results.extend(cyber_results)
+    if cyber_results:
+        yield "results", {"source": "CyberLeninka", "results": cyber_results}
+
+    if len(results) <= 3 and 'google_books' in fanout.futures:
+        books = fanout.result('google_books', default=[])
+        for b in books:
+            b['relevance_score'] = 80.0 if query.lower() in str(b['original_title']).lower() else 40.0
+        results.extend(books)
+        if books:
+            yield "results", {"source": "Google Books", "results": books}
+    else:
+        fanout.drop('google_books')
+
+    translate_titles(results, fanout)
+    yield "titles", {r["id"]: r["title"] for r in results}
+
+    yield "candidates", {
+        "results": results,
+        "author_profile": author_profile,
+        # Kept so search sessions can page further without redoing the expansion
+        "q_expanded": q_expanded,
+        "next_cursor": (data.get('meta') or {}).get('next_cursor'),
+        # Sources that missed the time budget or failed; the rest of the response is still complete
+        "skipped_sources": fanout.skipped
+    }
+
+def gather_search_candidates(query, filter_string, authors, journals, local_filters=None):
+    """Runs search_stages to the end and returns the unranked candidates, or None on an OpenAlex error.
+
+    The result does not depend on the user, so it is shared through SEARCH_CACHE.
+    """
+    for stage, payload in search_stages(query, filter_string, authors, journals, local_filters):
+        if stage == "error":
+            return None
+        if stage == "candidates":
+            return payload
+
+def candidates_ttl(candidates):
+    # Partial responses are cached briefly so a slow source gets another chance soon
+    return SEARCH_CACHE_PARTIAL_TTL if candidates["skipped_sources"] else SEARCH_CACHE_TTL
+
+# Shared across users: personalization is applied per request on top of the cached candidates
+SEARCH_CACHE_TTL = float(os.environ.get('SEARCH_CACHE_TTL', '600'))
+SEARCH_CACHE_PARTIAL_TTL = float(os.environ.get('SEARCH_CACHE_PARTIAL_TTL', '60'))
+SEARCH_CACHE_STALE = float(os.environ.get('SEARCH_CACHE_STALE', '3600'))
+SEARCH_CACHE = SWRCache(SEARCH_CACHE_TTL, SEARCH_CACHE_STALE, max_entries=512, ttl_for=candidates_ttl)
+
+def search_cache_key(query, *filters):
+    return (" ".join(query.lower().split()),) + tuple(str(f).strip().lower() for f in filters)
+
+# --------------------------
+# SEARCH SESSIONS ("load more")
+# --------------------------
+
+# A session holds everything needed to rank further OpenAlex pages of one
+# search: the expanded query, filters, the user's interest vector and the
+# score scale of the first page. It travels as a signed search_id (like the
+# session tokens), so any instance can serve the next page; each page
+# re-signs it, and it expires SEARCH_SESSION_TTL after the last page.
+SEARCH_SESSION_TTL = int(os.environ.get('SEARCH_SESSION_TTL', '1800'))
+SEARCH_SIGNER = URLSafeTimedSerializer(SESSION_SECRET, salt='search')
+
+def create_search_session(state):
+    return SEARCH_SIGNER.dumps(state)
+
+def get_search_session(search_id):
+    try:
+        return SEARCH_SIGNER.loads(search_id, max_age=SEARCH_SESSION_TTL)
+    except BadSignature:
+        return None
+
+def read_search_params(args):
+    params = {
+        "query": args.get('q', '').strip(),
+        "username": args.get('username', '').strip(),
+        "year_start": args.get('year_start', ''),
+        "year_end": args.get('year_end', ''),
+        "authors": args.get('authors', '').strip(),
+        "journals": args.get('journals', '').strip(),
+        "lang": args.get('lang', ''),
+        "min_citations": args.get('min_cites', ''),
+        "max_citations": args.get('max_cites', ''),
+        "work_type": args.get('work_type', '').strip(),
+        "bm25": args.get('bm25') == '1',
+        "local": args.get('local') == '1' or SEARCH_LOCAL_MODE
+    }
+    filters = (params["year_start"], params["year_end"], params["lang"], params["authors"], params["journals"],
+               params["min_citations"], params["max_citations"], params["work_type"])
+    params["filter_string"] = build_search_filters(*filters)
+    params["cache_key"] = search_cache_key(params["query"], *filters) + (params["local"],)
+    params["local_filters"] = local_index_filters(params)
+    return params
+
+def local_index_filters(params):
+    """Keyword arguments for OPENALEX_INDEX.search, or None when the index cannot answer this search."""
+    if not params["local"] or OPENALEX_INDEX is None:
+        return None
+    # The index does not store language, journal or work type, and matches authors only through full text
+    if params["lang"] or params["authors"] or params["journals"] or params["work_type"]:
+        return None
+    filters = {}
+    for name in ("year_start", "year_end", "min_citations", "max_citations"):
+        value = params[name]
+        try:
+            filters[name] = int(value) if value else None
+        except (TypeError, ValueError):
+            # Not a number: answer through OpenAlex, as the same search without local=1 does
+            return None
+    return filters
+
+def load_user_interest(query, username):
+    """Queues the query for the user's history and returns their interest vector including it.
+
+    The profile is only read here; HISTORY_WRITER stores the search and the
+    updated profile in the background.
+    """
+    user_interest = {}
+    if query and username:
+        now = time.time()
+        HISTORY_WRITER.add(username, query, now)
+        try:
+            rows = [tuple(r) for r in DB.all("user_interest", (username,))]
+            changed, _ = fold_interest(rows, query, now)
+            profile = {row[0]: row for row in rows}
+            profile.update((row[0], row) for row in changed)
+            user_interest = interest_vector(profile.values(), now)
+        except Exception as e:
+            print(f"History tracking error: {e}")
+    return user_interest
+
+def finish_search(candidates, params, user_interest):
+    """Ranks (copies of) the candidates for one user and opens a search session if more pages exist."""
+    # Ranking writes scores into the result dicts, so rank per-request copies
+    results = [dict(r) for r in candidates["results"]]
+    scale = batch_scale(results)
+    ranked = rank_results(results, params["query"], user_interest, bm25=params["bm25"], scale=scale)
+    ranked["author_profile"] = candidates["author_profile"]
+    ranked["skipped_sources"] = candidates["skipped_sources"]
+
+    ranked["next_cursor"] = candidates["next_cursor"]
+    ranked["search_id"] = None
+    if candidates["next_cursor"]:
+        ranked["search_id"] = create_search_session({
+            "query": params["query"],
+            "q_expanded": candidates["q_expanded"],
+            "filter_string": params["filter_string"],
+            "user_interest": user_interest,
+            "bm25": params["bm25"],
+            "scale": scale,
+        })
+    return ranked
+
+@app.route('/api/search', methods=['GET'])
+def search_papers():
+    params = read_search_params(request.args)
+    query = params["query"]
+    if not query and not params["filter_string"]:
+        return jsonify({"error": "Iltimos qidiruv mezoni kiriting"}), 400
+
+    user_interest = load_user_interest(query, params["username"])
+
+    candidates, cache_status = SEARCH_CACHE.get(
+        params["cache_key"],
+        lambda: gather_search_candidates(query, params["filter_string"], params["authors"], params["journals"],
+                                         params["local_filters"]))
+    if candidates is None:
+        return jsonify({"error": "Failed to fetch data from OpenAlex"}), 500
+
+    response = jsonify(finish_search(candidates, params, user_interest))
+    response.headers['X-Search-Cache'] = cache_status
+    return response
+
+def sse_event(event, payload):
+    return f"event: {event}\ndata: {json.dumps(payload, ensure_ascii=False)}\n\n"
+
+@app.route('/api/search/stream', methods=['GET'])
+def search_papers_stream():
+    """Same search as /api/search, streamed as Server-Sent Events while sources arrive.
+
+    Events: author_profile, results (once per source, OpenAlex titles still
+    untranslated), titles (id -> Uzbek title), ranking (the full /api/search
+    response) and done; or error.
+    """
+    params = read_search_params(request.args)
+    query = params["query"]
+    if not query and not params["filter_string"]:
+        return jsonify({"error": "Iltimos qidiruv mezoni kiriting"}), 400
+
+    user_interest = load_user_interest(query, params["username"])
+
+    def generate():
+        gather = lambda: gather_search_candidates(query, params["filter_string"], params["authors"], params["journals"],
+                                         params["local_filters"])
+        candidates = None
+        if SEARCH_CACHE.peek(params["cache_key"]) is not None:
+            # Cached: everything is ready, send it in one go (get() also refreshes stale entries)
+            candidates, _ = SEARCH_CACHE.get(params["cache_key"], gather)
+        if candidates is not None:
+            yield sse_event("author_profile", candidates["author_profile"])
+        else:
+            for stage, payload in search_stages(query, params["filter_string"], params["authors"], params["journals"],
+                                                params["local_filters"]):
+                if stage == "error":
+                    yield sse_event("error", {"error": payload})
+                    return
+                if stage == "candidates":
+                    candidates = payload
+                    SEARCH_CACHE.put(params["cache_key"], candidates)
+                else:
+                    yield sse_event(stage, payload)
+        yield sse_event("ranking", finish_search(candidates, params, user_interest))
+        yield sse_event("done", {})
+
+    response = Response(stream_with_context(generate()), mimetype='text/event-stream')
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Accel-Buffering'] = 'no'  # let proxies pass events through immediately
+    return response
+
+@app.route('/api/search/more', methods=['GET'])
+def search_more():
+    """Next OpenAlex page of an earlier search, ranked with the same context as the first page."""
+    search_id = request.args.get('search_id', '').strip()
+    cursor = request.args.get('cursor', '').strip()
+    if not search_id or not cursor:
+        return jsonify({"error": "search_id va cursor kiritilishi shart"}), 400
+
+    session = get_search_session(search_id)
+    if session is None:
+        return jsonify({"error": "Qidiruv sessiyasi topilmadi yoki muddati tugagan. Qidiruvni qaytadan boshlang."}), 404
+
+    fanout = SearchFanout()
+    fanout.start('openalex', fetch_openalex_works, session["q_expanded"], session["filter_string"], cursor)
+    response = fanout.result('openalex')
+    if response is None or response.status_code != 200:
         return jsonify({"error": "Failed to fetch data from OpenAlex"}), 500
+    data = response.json()
+
+    results = [process_work(w) for w in data.get('results', [])]
+    translate_titles(results, fanout)
+
+    ranked = rank_results(results, session["query"], session["user_interest"],
+                          bm25=session["bm25"], scale=session["scale"])
+    ranked["search_id"] = create_search_session(session)
+    ranked["next_cursor"] = (data.get('meta') or {}).get('next_cursor')
+    ranked["skipped_sources"] = fanout.skipped
+    return jsonify(ranked)
+
+# References shown in a paper graph by default; ?refs= can ask for up to PAPER_REFERENCE_MAX
+PAPER_REFERENCE_LIMIT = int(os.environ.get('PAPER_REFERENCE_LIMIT', '10'))
+PAPER_REFERENCE_MAX = 200
+PAPER_CITED_BY_LIMIT = 15
+# OpenAlex accepts at most 100 values in one OR filter and 200 results per page
+OPENALEX_MAX_FILTER_IDS = 100
+OPENALEX_MAX_PER_PAGE = 200
+OPENALEX_WORK_ID_RE = re.compile(r'^W\d+$', re.IGNORECASE)
+
+# Multi-hop paper graphs (?depth=2..3): per-work fan-out beyond the first hop,
+# node budget, concurrent OpenAlex requests per graph and overall time budget
+GRAPH_MAX_DEPTH = 3
+GRAPH_MAX_NODES = int(os.environ.get('GRAPH_MAX_NODES', '300'))
+GRAPH_NODE_LIMIT = 2000
+GRAPH_HOP_REFERENCES = int(os.environ.get('GRAPH_HOP_REFERENCES', '10'))
+GRAPH_HOP_CITED_BY = int(os.environ.get('GRAPH_HOP_CITED_BY', '10'))
+GRAPH_MAX_INFLIGHT = int(os.environ.get('GRAPH_MAX_INFLIGHT', '4'))
+GRAPH_BUDGET = float(os.environ.get('GRAPH_BUDGET', '15'))
+# Graphs collect up to GRAPH_OVERFETCH times the works they show, then keep the most central
+# (multi-hop: times max_nodes; one hop: times refs and PAPER_CITED_BY_LIMIT)
+GRAPH_OVERFETCH = int(os.environ.get('GRAPH_OVERFETCH', '2'))
+
+# Works and citation edges seen by the graph endpoints, read before asking OpenAlex.
+# Entries older than CITATION_STORE_MAX_AGE are still served but refreshed in the background.
+CITATION_STORE = CitationStore(Database(os.path.join(os.path.dirname(DB_FILE), "citation_store.db"),
+                                        size=int(os.environ.get('CITATION_DB_POOL_SIZE', '8'))))
+CITATION_STORE_MAX_AGE = float(os.environ.get('CITATION_STORE_MAX_AGE', str(7 * 86400)))
+CITATION_REFRESH_EXECUTOR = concurrent.futures.ThreadPoolExecutor(max_workers=2, thread_name_prefix='citation-refresh')
+CITATION_REFRESHING = set()
+CITATION_REFRESHING_LOCK = threading.Lock()
+OPENALEX_WORK_URL = "https://openalex.org/"
+
+def refresh_in_background(key, fn, *args):
+    """Runs fn once per key at a time on the refresh pool (repeat views of a stale paper share one refresh)."""
+    with CITATION_REFRESHING_LOCK:
+        if key in CITATION_REFRESHING:
+            return
+        CITATION_REFRESHING.add(key)
+
+    def run():
+        try:
+            fn(*args)
+        except Exception as e:
+            print(f"Citation store refresh error for {key}: {e}")
+        finally:
+            with CITATION_REFRESHING_LOCK:
+                CITATION_REFRESHING.discard(key)
+    CITATION_REFRESH_EXECUTOR.submit(run)
+
+def is_stale(fetched_at):
+    return time.time() - fetched_at > CITATION_STORE_MAX_AGE
+
+def openalex_works_by_ids(ids, endpoint):
+    ids = [i.split("openalex.org/")[-1] for i in ids[:OPENALEX_MAX_FILTER_IDS]]
+    if not ids:
+        return []
+    response = openalex_get(f"{OPENALEX_API_URL}/works?filter=openalex_id:{'|'.join(ids)}&per-page={len(ids)}", endpoint)
+    response.raise_for_status()
+    works = response.json().get("results", [])
+    CITATION_STORE.save_works(works)
+    return works
+
+def openalex_cited_by(work_id, per_page, endpoint):
+    response = openalex_get(f"{OPENALEX_API_URL}/works?filter=cites:{work_id}&sort=cited_by_count:desc"
+                            f"&per-page={per_page}", endpoint)
+    response.raise_for_status()
+    works = response.json().get("results", [])
+    CITATION_STORE.save_citations(OPENALEX_WORK_URL + work_id, works, per_page)
+    return works
+
+def fetch_works_by_ids(ids, endpoint="graph"):
+    """Up to OPENALEX_MAX_FILTER_IDS works: stored ones from CITATION_STORE, the rest in one
+    request via filter=openalex_id:W1|W2|..."""
+    ids = ids[:OPENALEX_MAX_FILTER_IDS]
+    stored = CITATION_STORE.get_works(ids, with_references=(endpoint == "graph"))
+    stale = [i for i, (_, fetched_at) in stored.items() if is_stale(fetched_at)]
+    if stale:
+        refresh_in_background(("works", tuple(sorted(stale))), openalex_works_by_ids, stale, endpoint)
+    works = [work for work, _ in stored.values()]
+    missing = [i for i in ids if i not in stored]
+    if missing:
+        works += openalex_works_by_ids(missing, endpoint)
+    return works
+
+def fetch_cited_by(work_id, per_page=PAPER_CITED_BY_LIMIT, endpoint="graph"):
+    """Most cited works citing one work, from CITATION_STORE when a stored query covers per_page."""
+    stored = CITATION_STORE.get_citing(OPENALEX_WORK_URL + work_id, per_page)
+    if stored is not None:
+        works, fetched_at = stored
+        if endpoint != "graph" or all("referenced_works" in w for w in works):
+            if is_stale(fetched_at):
+                refresh_in_background(("cited_by", work_id), openalex_cited_by, work_id, per_page, endpoint)
+            return works
+    return openalex_cited_by(work_id, per_page, endpoint)
+
+def fetch_main_paper(paper_id):
+    """The paper a graph is centred on (with referenced_works), or None if OpenAlex does not know it."""
+    if OPENALEX_WORK_ID_RE.match(paper_id):
+        stored = CITATION_STORE.get_works([OPENALEX_WORK_URL + paper_id], with_references=True)
+        if stored:
+            work, fetched_at = next(iter(stored.values()))
+            if is_stale(fetched_at):
+                refresh_in_background(("paper", paper_id), fetch_main_paper_upstream, paper_id)
+            return work
+    return fetch_main_paper_upstream(paper_id)
+
+def fetch_main_paper_upstream(paper_id):
+    response = openalex_get(f"{OPENALEX_API_URL}/works/{paper_id}", "paper")
+    if response.status_code != 200:
+        return None
+    work = response.json()
+    CITATION_STORE.save_works([work])
+    return work
+
+def fetch_citing_works(ids, per_page):
+    """Most cited works citing any of up to OPENALEX_MAX_FILTER_IDS works, in one request (filter=cites:W1|W2|...)."""
+    ids = [i.split("openalex.org/")[-1] for i in ids[:OPENALEX_MAX_FILTER_IDS]]
+    if not ids or per_page <= 0:
+        return []
+    url = (f"{OPENALEX_API_URL}/works?filter=cites:{'|'.join(ids)}&sort=cited_by_count:desc"
+           f"&per-page={min(per_page, OPENALEX_MAX_PER_PAGE)}")
+    response = openalex_get(url, "graph")
+    response.raise_for_status()
+    works = response.json().get("results", [])
+    # Adds these works and, through their referenced_works, their citation edges to the store
+    CITATION_STORE.save_works(works)
+    return works
+
+def work_node(work, group, hop=1):
+    node = {
+        "id": work.get("id"),
+        "label": get_author_label(work),
+        "title": work.get("title", "Untitled"),
+        "group": group,
+        "value": work.get("cited_by_count", 0) + 1
+    }
+    if hop > 1:
+        node["hop"] = hop
+    return node
+
+def expand_citation_graph(frontier, known_ids, depth, budget, fanout):
+    """Breadth-first expansion of a paper graph from its first-hop works out to `depth` hops.
+
+    Each hop resolves the frontier's unseen references (batched by id) and
+    its most cited citing works (batched by cites:) with at most
+    GRAPH_MAX_INFLIGHT requests in flight. Works already in the graph are
+    never fetched again, and expansion stops once `budget` new works are
+    added. Frontier works must carry `referenced_works`.
+    Returns (nodes, edges, truncated); edges only join works in the graph.
+    """
+    # A pool of this graph's own, so queued hop requests wait in its queue instead of
+    # holding UPSTREAM_EXECUTOR threads that /api/search fan-out needs
+    hops = concurrent.futures.ThreadPoolExecutor(max_workers=GRAPH_MAX_INFLIGHT, thread_name_prefix='graph-hop')
+
+    graph_ids = set(known_ids)
+    nodes = []
+    links = []
+    truncated = False
+    for hop in range(2, depth + 1):
+        if not frontier:
+            break
+        if budget <= 0:
+            truncated = True
+            break
+        frontier_ids = [w.get("id") for w in frontier]
+
+        wanted = []
+        wanted_set = set()
+        for work in frontier:
+            for ref in work.get("referenced_works", [])[:GRAPH_HOP_REFERENCES]:
+                links.append((work.get("id"), ref))
+                if ref not in graph_ids and ref not in wanted_set:
+                    wanted_set.add(ref)
+                    wanted.append(ref)
+        if len(wanted) > budget:
+            wanted = wanted[:budget]
+            truncated = True
+
+        ref_batches = [wanted[i:i + OPENALEX_MAX_FILTER_IDS] for i in range(0, len(wanted), OPENALEX_MAX_FILTER_IDS)]
+        cite_batches = [frontier_ids[i:i + OPENALEX_MAX_FILTER_IDS]
+                        for i in range(0, len(frontier_ids), OPENALEX_MAX_FILTER_IDS)]
+        for i, batch in enumerate(ref_batches):
+            fanout.start_on(hops, f'hop{hop}_references_{i}', fetch_works_by_ids, batch, "graph")
+        for i, batch in enumerate(cite_batches):
+            fanout.start_on(hops, f'hop{hop}_cited_by_{i}', fetch_citing_works, batch,
+                            min(budget, GRAPH_HOP_CITED_BY * len(batch)))
+
+        next_frontier = []
+        def add(work, group):
+            nonlocal budget, truncated
+            work_id = work.get("id")
+            if not work_id or work_id in graph_ids:
+                return
+            if budget <= 0:
+                truncated = True
+                return
+            graph_ids.add(work_id)
+            budget -= 1
+            nodes.append(work_node(work, group, hop))
+            next_frontier.append(work)
+
+        ref_by_id = {}
+        for i in range(len(ref_batches)):
+            for work in fanout.result(f'hop{hop}_references_{i}', default=[]):
+                ref_by_id[work.get("id")] = work
+        for ref in wanted:
+            if ref in ref_by_id:
+                add(ref_by_id[ref], "reference")
+
+        for i in range(len(cite_batches)):
+            for work in fanout.result(f'hop{hop}_cited_by_{i}', default=[]):
+                links.extend((work.get("id"), ref) for ref in work.get("referenced_works", []) if ref in graph_ids)
+                add(work, "cited_by")
+
+        frontier = next_frontier
+    # Calls abandoned at the deadline finish in the background; queued ones are dropped
+    hops.shutdown(wait=False, cancel_futures=True)
+
+    edges = []
+    seen_links = set()
+    for source, target in links:
+        if source in graph_ids and target in graph_ids and (source, target) not in seen_links:
+            seen_links.add((source, target))
+            edges.append({"from": source, "to": target, "arrows": "to"})
+    return nodes, edges, truncated
+
+def read_int_arg(name, default, low, high):
+    try:
+        return max(low, min(int(request.args.get(name, default)), high))
+    except ValueError:
+        return default
+
+# Server-side layouts (?layout=server), by graph content; a repeat view skips the computation
+LAYOUT_CACHE = LayoutCache(max_entries=int(os.environ.get('GRAPH_LAYOUT_CACHE_SIZE', '256')))
+
+# Collapsed communities (?cluster=1, or ?cluster=auto past GRAPH_CLUSTER_THRESHOLD nodes),
+# kept so /api/graph/cluster/<id> can expand them later. GRAPH_CLUSTERS is only
+# this instance's cache: a collapsed graph also carries "cluster_source", the
+# signed request that built it, and an instance that misses the cluster replays
+# that request (collapsing is seeded, so it comes out with the same ids).
+GRAPH_CLUSTER_THRESHOLD = int(os.environ.get('GRAPH_CLUSTER_THRESHOLD', '300'))
+GRAPH_CLUSTER_SOURCE_TTL = int(os.environ.get('GRAPH_CLUSTER_SOURCE_TTL', str(12 * 3600)))
+MAX_GRAPH_CLUSTERS = 2000
+GRAPH_CLUSTERS = OrderedDict()
+GRAPH_CLUSTERS_LOCK = threading.Lock()
+GRAPH_SOURCE_SIGNER = URLSafeTimedSerializer(SESSION_SECRET, salt='graph-cluster')
+
+def collapse_graph(graph):
+    graph, clusters = collapse(graph, f"cluster_{graph_key(graph['nodes'], graph['edges'])[:12]}")
+    with GRAPH_CLUSTERS_LOCK:
+        for cluster_id, cluster in clusters.items():
+            GRAPH_CLUSTERS[cluster_id] = cluster
+            GRAPH_CLUSTERS.move_to_end(cluster_id)
+        while len(GRAPH_CLUSTERS) > MAX_GRAPH_CLUSTERS:
+            GRAPH_CLUSTERS.popitem(last=False)
+    if clusters:
+        # format and layout do not change the clusters; a replay skips the layout
+        args = {k: v for k, v in request.args.items() if k not in ('format', 'layout')}
+        graph["cluster_source"] = GRAPH_SOURCE_SIGNER.dumps({"path": request.path, "args": args})
+    return graph
+
+def get_graph_cluster(cluster_id):
+    with GRAPH_CLUSTERS_LOCK:
+        return GRAPH_CLUSTERS.get(cluster_id)
+
+def replay_graph_source(source):
+    """Rebuilds the graph a signed cluster_source names, which refills GRAPH_CLUSTERS on this instance."""
+    try:
+        source = GRAPH_SOURCE_SIGNER.loads(source, max_age=GRAPH_CLUSTER_SOURCE_TTL)
+    except BadSignature:
+        return
+    with app.test_request_context(source["path"], query_string=source["args"]):
+        try:
+            app.dispatch_request()
+        except Exception as e:
+            print(f"Graph cluster rebuild error: {e}")
+
+def graph_json(graph):
+    if request.args.get('format') == 'compact':
+        return jsonify(graph_wire.encode(graph))
+    return jsonify(graph)
+
+def graph_response(graph, max_nodes=None, group_limits=None):
+    """Graph endpoint response: vis-network JSON, or graph_wire's columnar form with ?format=compact.
+
+    Every node gets a "centrality" score (graph_analytics) and graphs larger
+    than max_nodes (default: the ?max_nodes param) keep their most central
+    nodes, as do node groups over their group_limits. ?cluster folds communities into cluster nodes (graph_clusters).
+    With ?layout=server every node gets x/y from graph_layout and the
+    response carries "layout" (the cache key), so the client can skip physics.
+    """
+    if max_nodes is None:
+        max_nodes = read_int_arg('max_nodes', GRAPH_NODE_LIMIT, 1, GRAPH_NODE_LIMIT)
+    rank_graph(graph, max_nodes, group_limits)
+    cluster = request.args.get('cluster')
+    if cluster == '1' or (cluster == 'auto' and len(graph["nodes"]) > GRAPH_CLUSTER_THRESHOLD):
+        graph = collapse_graph(graph)
+    if request.args.get('layout') == 'server':
+        apply_layout(graph, LAYOUT_CACHE)
+    return graph_json(graph)
+
+@app.route('/api/graph/cluster/<cluster_id>', methods=['GET'])
+def expand_graph_cluster(cluster_id):
+    """Members of a collapsed cluster and every edge touching them.
+
+    "clusters" maps edge endpoints that are still folded into another
+    cluster to that cluster's id. ?source is the graph's cluster_source, used
+    when this instance did not build the graph.
+    """
+    cluster = get_graph_cluster(cluster_id)
+    if cluster is None and request.args.get('source'):
+        replay_graph_source(request.args['source'])
+        cluster = get_graph_cluster(cluster_id)
+    if cluster is None:
+        return jsonify({"error": "Klaster topilmadi. Grafni qayta yuklang."}), 404
+    return graph_json({"cluster": cluster_id, "nodes": cluster["nodes"], "edges": cluster["edges"],
+                       "clusters": cluster["clusters"]})
+
+# Delta expansion: neighbours per page, and at most GRAPH_EXPAND_KNOWN ids the client already shows
+GRAPH_EXPAND_LIMIT = int(os.environ.get('GRAPH_EXPAND_LIMIT', '25'))
+GRAPH_EXPAND_KNOWN = 5000
+# OpenAlex pages through at most 10000 results of one query
+OPENALEX_MAX_RESULTS = 10000
+WIKIDATA_ID_RE = re.compile(r'^Q\d+$')
+
+def fetch_citing_page(work_id, page, per_page):
+    """(works citing work_id on one page of per_page, most cited first, whether more pages follow)."""
+    stored = CITATION_STORE.get_citing(OPENALEX_WORK_URL + work_id, page * per_page)
+    if stored is not None:
+        works, _ = stored
+        return works[(page - 1) * per_page:], len(works) == page * per_page
+    response = openalex_get(f"{OPENALEX_API_URL}/works?filter=cites:{work_id}&sort=cited_by_count:desc"
+                            f"&per-page={per_page}&page={page}", "graph")
+    response.raise_for_status()
+    data = response.json()
+    works = data.get("results", [])
+    CITATION_STORE.save_works(works)
+    total = (data.get("meta") or {}).get("count", 0)
+    return works, page * per_page < min(total, OPENALEX_MAX_RESULTS)
+
+def expand_paper(work_id, known, cursor, limit):
+    """One page of a paper's neighbours: its references first, then the works citing it.
+
+    cursor is "refs:<offset>" or "cites:<page>". Neighbours the client
+    already has only contribute edges. Returns (graph, next cursor) or None
+    when the paper is unknown.
+    """
+    main_paper = fetch_main_paper(work_id)
+    if main_paper is None:
+        return None
+    main_id = main_paper.get("id")
+    phase, position = cursor
+    new_works = []
+    edges = []
+
+    references = main_paper.get("referenced_works", [])
+    if phase == "refs" and position >= len(references):
+        phase, position = "cites", 1
+    if phase == "refs":
+        page = references[position:position + limit]
+        unknown = [ref for ref in page if ref not in known]
+        found = {}
+        for i in range(0, len(unknown), OPENALEX_MAX_FILTER_IDS):
+            for work in fetch_works_by_ids(unknown[i:i + OPENALEX_MAX_FILTER_IDS], "graph"):
+                found[work.get("id")] = work
+        for ref in page:
+            if ref in found:
+                new_works.append((found[ref], "reference"))
+            if ref in found or ref in known:
+                edges.append({"from": main_id, "to": ref, "arrows": "to"})
+        next_cursor = f"refs:{position + limit}" if position + limit < len(references) else "cites:1"
+    else:
+        citing, more = fetch_citing_page(work_id, position, limit)
+        for work in citing:
+            if work.get("id") not in known:
+                new_works.append((work, "cited_by"))
+            edges.append({"from": work.get("id"), "to": main_id, "arrows": "to"})
+        next_cursor = f"cites:{position + 1}" if more else None
+
+    # Citations among the new works and to what the client already has
+    new_ids = {work.get("id") for work, _ in new_works}
+    linked = {(e["from"], e["to"]) for e in edges}
+    for work, _ in new_works:
+        for ref in work.get("referenced_works", []):
+            if (ref in new_ids or ref in known) and ref != main_id and (work.get("id"), ref) not in linked:
+                linked.add((work.get("id"), ref))
+                edges.append({"from": work.get("id"), "to": ref, "arrows": "to"})
+    nodes = [work_node(work, group) for work, group in new_works]
+    return {"nodes": nodes, "edges": edges}, next_cursor
+
+def read_expand_cursor(cursor):
+    if not cursor:
+        return "refs", 0
+    phase, _, position = str(cursor).partition(":")
+    if phase not in ("refs", "cites") or not position.isdigit():
+        raise ValueError(cursor)
+    return phase, max(int(position), 1 if phase == "cites" else 0)
+
+@app.route('/api/graph/expand', methods=['POST'])
+def expand_graph_node():
+    """Only what is new around one node: body {"node", "known": [ids on screen], "cursor", "limit"}.
+
+    OpenAlex works page through their references, then their citing works
+    (most cited first); Wikidata entities return their related entities.
+    The response has "nodes", "edges" and "next_cursor" (null on the last page).
+    """
+    data = request.json or {}
+    node_id = str(data.get("node") or "")
+    known = set(map(str, (data.get("known") or [])[:GRAPH_EXPAND_KNOWN]))
+    try:
+        limit = max(1, min(int(data.get("limit", GRAPH_EXPAND_LIMIT)), OPENALEX_MAX_PER_PAGE))
+        cursor = read_expand_cursor(data.get("cursor"))
+    except ValueError:
+        return jsonify({"error": "Noto'g'ri so'rov parametrlari."}), 400
+    known.add(node_id)
+
+    work_id = node_id.split("openalex.org/")[-1]
+    if OPENALEX_WORK_ID_RE.match(work_id):
+        try:
+            expanded = expand_paper(work_id.upper(), known, cursor, limit)
+        except Exception as e:
+            print(f"Graph expand error for {work_id}: {e}")
+            return jsonify({"error": "Failed to fetch data from OpenAlex"}), 500
+        if expanded is None:
+            return jsonify({"error": "Paper not found"}), 404
+        graph, next_cursor = expanded
+    elif WIKIDATA_ID_RE.match(node_id):
+        nodes, edges = wikidata_neighbour_graph(node_id)
+        graph = {"nodes": [n for n in nodes if n["id"] not in known], "edges": edges}
+        next_cursor = None
+    else:
+        return jsonify({"error": "Bu tugunni kengaytirib bo'lmaydi."}), 400
+
+    graph["node"] = node_id
+    graph["next_cursor"] = next_cursor
+    return graph_json(graph)
 
 @app.route('/api/paper/<path:paper_id>/network', methods=['GET'])
 def get_paper_network(paper_id):
+    """Citation graph around one paper.
+
+    Query params: refs (references of the paper), depth (1-3 hops over
+    references and citations) and max_nodes (nodes in the graph, the most
+    central ones kept; multi-hop graphs collect GRAPH_OVERFETCH times as many
+    works to choose from). One-hop graphs fetch GRAPH_OVERFETCH times refs
+    references and PAPER_CITED_BY_LIMIT citing works, link the ones that cite
+    each other, and keep the most central of each kind.
+    """
     paper_id = urllib.parse.unquote(paper_id)
     # Extract just the ID part if the full OpenAlex URI is passed
     if "openalex.org/" in paper_id:
          paper_id = paper_id.split("openalex.org/")[-1]
-         
+    ref_limit = read_int_arg('refs', PAPER_REFERENCE_LIMIT, 0, PAPER_REFERENCE_MAX)
+    depth = read_int_arg('depth', 1, 1, GRAPH_MAX_DEPTH)
+    max_nodes = read_int_arg('max_nodes', GRAPH_MAX_NODES, 1, GRAPH_NODE_LIMIT)
+    # First-hop works come with their references ("graph" select): deeper hops follow them,
+    # and a one-hop graph links the works among themselves to rank them
+    overfetch = GRAPH_OVERFETCH if depth == 1 else 1
+
+    fanout = SearchFanout(GRAPH_BUDGET if depth > 1 else None)
+    # Citing works only need the id, so with a W-id they load while the main paper does
+    if OPENALEX_WORK_ID_RE.match(paper_id):
+        paper_id = paper_id.upper()
+        fanout.start('cited_by', fetch_cited_by, paper_id, PAPER_CITED_BY_LIMIT * overfetch, "graph")
+
     # Fetch the main paper
-    main_paper_response = requests.get(f"{OPENALEX_API_URL}/works/{paper_id}")
-    if main_paper_response.status_code != 200:
+    main_paper = fetch_main_paper(paper_id)
+    if main_paper is None:
+        fanout.drop('cited_by')
         return jsonify({"error": "Paper not found"}), 404
-        
-    main_paper = main_paper_response.json()
-    
+
     nodes = []
     edges = []
-    
+
     # Add main node
     nodes.append({
         "id": main_paper.get("id"),
@@ -883,7 +1727,7 @@ def get_paper_network(paper_id):
         "y": 0,
         "fixed": {"x": True, "y": True}
     })
-    
+
     # Add Author nodes for the main paper
     for author_obj in main_paper.get("authorships", []):
         author_info = author_obj.get("author", {})
@@ -903,54 +1747,69 @@ def get_paper_network(paper_id):
                 "to": main_paper.get("id"),
                 "arrows": "to"
             })
-    
-    # Fetch works that CITE this paper (kimlar bu kitob/maqola haqida yozgan)
-    cited_by_url = f"{OPENALEX_API_URL}/works?filter=cites:{main_paper.get('id')}&per-page=15"
-    try:
-        cites_res = requests.get(cited_by_url, timeout=5)
-        if cites_res.status_code == 200:
-            cites_data = cites_res.json().get("results", [])
-            for cite in cites_data:
-                nodes.append({
-                    "id": cite.get("id"),
-                    "label": get_author_label(cite),
-                    "title": cite.get("title", "Untitled"),
-                    "group": "cited_by",
-                    "value": cite.get("cited_by_count", 0) + 1
-                })
-                # Edge from citing work -> main paper
-                edges.append({
-                    "from": cite.get("id"),
-                    "to": main_paper.get("id"),
-                    "arrows": "to"
-                })
-    except Exception as e:
-        print(f"Error fetching cited by: {e}")
 
-    # Fetch referenced works (papers this paper cites)
-    referenced_works = main_paper.get("referenced_works", [])[:10] # Limit to 10
-    
+    # Referenced works (papers this paper cites): one batched request per 100 ids, all in parallel
+    referenced_works = main_paper.get("referenced_works", [])[:ref_limit * overfetch]
+    ref_batches = [referenced_works[i:i + OPENALEX_MAX_FILTER_IDS]
+                   for i in range(0, len(referenced_works), OPENALEX_MAX_FILTER_IDS)]
+    for i, batch in enumerate(ref_batches):
+        fanout.start(f'references_{i}', fetch_works_by_ids, batch, "graph")
+    if 'cited_by' not in fanout.futures:
+        fanout.start('cited_by', fetch_cited_by, main_paper.get("id", "").split("openalex.org/")[-1],
+                     PAPER_CITED_BY_LIMIT * overfetch, "graph")
+
+    first_hop = []
+    # Works that CITE this paper (kimlar bu kitob/maqola haqida yozgan)
+    for cite in fanout.result('cited_by', default=[]):
+        first_hop.append(cite)
+        nodes.append(work_node(cite, "cited_by"))
+        # Edge from citing work -> main paper
+        edges.append({
+            "from": cite.get("id"),
+            "to": main_paper.get("id"),
+            "arrows": "to"
+        })
+
+    # The filter returns works in its own order; keep the paper's reference order
+    ref_by_id = {}
+    for i in range(len(ref_batches)):
+        for work in fanout.result(f'references_{i}', default=[]):
+            ref_by_id[work.get("id")] = work
+
     for ref_id in referenced_works:
-        ref_response = requests.get(f"{OPENALEX_API_URL}/works/{ref_id.split('openalex.org/')[-1]}")
-        if ref_response.status_code == 200:
-            ref_data = ref_response.json()
-            nodes.append({
-                "id": ref_data.get("id"),
-                "label": get_author_label(ref_data),
-                "title": ref_data.get("title", "Untitled"),
-                "group": "reference",
-                "value": ref_data.get("cited_by_count", 0) + 1
-            })
+        ref_data = ref_by_id.get(ref_id)
+        if ref_data:
+            first_hop.append(ref_data)
+            nodes.append(work_node(ref_data, "reference"))
             edges.append({
                 "from": main_paper.get("id"),
                 "to": ref_data.get("id"),
                 "arrows": "to"
             })
-            
-    return jsonify({
-        "nodes": nodes,
-        "edges": edges
-    })
+
+    result = {"nodes": nodes, "edges": edges}
+    if depth == 1:
+        # Citations among the first-hop works, so centrality can tell the candidates apart
+        hop_ids = {w.get("id") for w in first_hop}
+        linked = set()
+        for work in first_hop:
+            for ref_id in work.get("referenced_works") or []:
+                if ref_id in hop_ids and ref_id != work.get("id") and (work.get("id"), ref_id) not in linked:
+                    linked.add((work.get("id"), ref_id))
+                    edges.append({"from": work.get("id"), "to": ref_id, "arrows": "to"})
+        return graph_response(result, max_nodes, {"reference": ref_limit, "cited_by": PAPER_CITED_BY_LIMIT})
+
+    known_ids = {main_paper.get("id")} | {w.get("id") for w in first_hop}
+    collect = min(GRAPH_NODE_LIMIT, max_nodes * GRAPH_OVERFETCH)
+    more_nodes, more_edges, truncated = expand_citation_graph(
+        first_hop, known_ids, depth, max(0, collect - len(known_ids)), fanout)
+    # Hop-1 edges to the main paper are already in the list
+    hop1_edges = {(e["from"], e["to"]) for e in edges}
+    nodes.extend(more_nodes)
+    edges.extend(e for e in more_edges if (e["from"], e["to"]) not in hop1_edges)
+    result["truncated"] = truncated
+    result["skipped_sources"] = fanout.skipped
+    return graph_response(result, max_nodes)
 
 @app.route('/api/author/<author_name>/network', methods=['GET'])
 def get_author_network(author_name):
@@ -1109,7 +1968,7 @@ def get_author_network(author_name):
                     "arrows": "to"
                 })
 
-    return jsonify({
+    return graph_response({
         "nodes": nodes,
         "edges": edges
     })
@@ -1184,7 +2043,7 @@ def get_category_network(category_name):
                 "arrows": "to"
             })
             
-    return jsonify({
+    return graph_response({
         "nodes": nodes,
         "edges": edges
     })
@@ -1202,41 +2061,43 @@ def load_local_authors():
 
 LOCAL_AUTHORS_DB = load_local_authors()
 
-def find_local_author(name):
-    def simplify(text):
-        if not text: return ""
-        # Remove apostrophes and standardize common confusing letters
-        t = text.lower().replace("'", "").replace("‘", "").replace("’", "").replace("`", "")
-        t = t.replace("o", "a").replace("u", "a").replace("ў", "у").replace("ё", "йо")
-        return t
+def simplify_name(text):
+    if not text: return ""
+    # Remove apostrophes and standardize common confusing letters
+    t = text.lower().replace("'", "").replace("‘", "").replace("’", "").replace("`", "")
+    t = t.replace("o", "a").replace("u", "a").replace("ў", "у").replace("ё", "йо")
+    return t
+
+def build_local_author_targets(authors):
+    """Precomputes the simplified name/alias forms (in both scripts) that find_local_author matches against."""
+    targets = []
+    for author in authors:
+        texts = [author.get('name', '').lower()]
 
-    name_lower = name.lower()
-    name_translit = uz_transliterate(name).lower()
-    
-    matches_simp = [simplify(name_lower), simplify(name_translit)]
-    
-    for author in LOCAL_AUTHORS_DB:
-        author_name = author.get('name', '').lower()
-        author_name_translit = uz_transliterate(author_name).lower()
-        
-        targets_simp = [simplify(author_name), simplify(author_name_translit)]
-        
         aliases = author.get('alias', '')
         if aliases:
-            aliases_str = " ".join(aliases).lower() if isinstance(aliases, list) else str(aliases).lower()
-            aliases_translit = uz_transliterate(aliases_str).lower()
-            targets_simp.extend([simplify(aliases_str), simplify(aliases_translit)])
-            
+            texts.append(" ".join(aliases).lower() if isinstance(aliases, list) else str(aliases).lower())
+
         other_names = author.get('other_names', [])
         if other_names:
-            other_names_str = " ".join(other_names).lower() if isinstance(other_names, list) else str(other_names).lower()
-            other_names_translit = uz_transliterate(other_names_str).lower()
-            targets_simp.extend([simplify(other_names_str), simplify(other_names_translit)])
-            
+            texts.append(" ".join(other_names).lower() if isinstance(other_names, list) else str(other_names).lower())
+
+        translits = [t.lower() for t in transliterate_many(texts)]
+        simplified = [simplify_name(t) for pair in zip(texts, translits) for t in pair]
+        targets.append((author, [t for t in simplified if t]))
+    return targets
+
+LOCAL_AUTHOR_TARGETS = build_local_author_targets(LOCAL_AUTHORS_DB)
+
+def find_local_author(name):
+    name_lower = name.lower()
+    name_translit = uz_transliterate(name).lower()
+    
+    matches_simp = [m for m in (simplify_name(name_lower), simplify_name(name_translit)) if m]
+    
+    for author, targets_simp in LOCAL_AUTHOR_TARGETS:
         for m in matches_simp:
-            if not m: continue
             for t in targets_simp:
-                if not t: continue
                 if m in t:
                     return author
     return None
@@ -1250,7 +2111,7 @@ def search_wikidata_entity(name):
     url = f"https://www.wikidata.org/w/api.php?action=wbsearchentities&search={urllib.parse.quote(name)}&language=uz&uselang=en&format=json"
     headers = {'User-Agent': 'LibUZ/1.0 (https://libuz.vercel.app)'}
     try:
-        response = requests.get(url, headers=headers, timeout=3)
+        response = http_client.get(url, headers=headers)
         if response.status_code == 200:
             data = response.json()
             if data.get("search") and len(data["search"]) > 0:
@@ -1270,14 +2131,20 @@ def search_wikidata_entity(name):
         print(f"Wikidata Search Error: {e}")
     return None
 
-def get_wikidata_network(entity_id, max_nodes=30):
-    cache_key = f"network_{entity_id}"
+# Relations a person graph follows: influenced by, student, student of, notable work,
+# educated at, spouse, child, father, mother, sibling, relative, occupation
+WIKIDATA_RELATION_PROPS = "wdt:P737 wdt:P802 wdt:P1066 wdt:P800 wdt:P69 wdt:P26 wdt:P40 wdt:P22 wdt:P25 wdt:P3373 wdt:P1038 wdt:P106"
+# Related entities shown around a person; the SPARQL query asks for GRAPH_OVERFETCH times as many
+WIKIDATA_NEIGHBOURS = 30
+
+def get_wikidata_network(entity_id, max_nodes=WIKIDATA_NEIGHBOURS):
+    cache_key = f"network_{entity_id}_{max_nodes}"
     if cache_key in WIKIDATA_CACHE:
         return WIKIDATA_CACHE[cache_key]
         
     query = """
     SELECT ?rel ?relLabel ?item ?itemLabel ?itemDescription ?dir WHERE {
-      VALUES ?relProp { wdt:P737 wdt:P802 wdt:P1066 wdt:P800 wdt:P69 wdt:P26 wdt:P40 wdt:P22 wdt:P25 wdt:P3373 wdt:P1038 wdt:P106 }
+      VALUES ?relProp { %s }
       
       { 
         wd:%s ?relProp ?item . 
@@ -1293,7 +2160,7 @@ def get_wikidata_network(entity_id, max_nodes=30):
       
       SERVICE wikibase:label { bd:serviceParam wikibase:language "[AUTO_LANGUAGE],uz,en,ru". }
     } LIMIT %d
-    """ % (entity_id, entity_id, max_nodes)
+    """ % (WIKIDATA_RELATION_PROPS, entity_id, entity_id, max_nodes)
     
     url = "https://query.wikidata.org/sparql"
     headers = {
@@ -1301,7 +2168,7 @@ def get_wikidata_network(entity_id, max_nodes=30):
         'Accept': 'application/sparql-results+json'
     }
     try:
-        response = requests.get(url, params={'query': query}, headers=headers, timeout=4)
+        response = http_client.get(url, params={'query': query}, headers=headers)
         if response.status_code == 200:
             data = response.json()
             WIKIDATA_CACHE[cache_key] = data
@@ -1310,6 +2177,98 @@ def get_wikidata_network(entity_id, max_nodes=30):
         print(f"SPARQL Error: {e}")
     return None
 
+def get_wikidata_links(entity_ids):
+    """SPARQL bindings (?a ?b ?relLabel) for the WIKIDATA_RELATION_PROPS relations among entity_ids."""
+    cache_key = "links_" + "|".join(sorted(entity_ids))
+    if cache_key in WIKIDATA_CACHE:
+        return WIKIDATA_CACHE[cache_key]
+    values = " ".join(f"wd:{i}" for i in entity_ids)
+    query = """
+    SELECT ?a ?b ?relLabel WHERE {
+      VALUES ?a { %s }
+      VALUES ?b { %s }
+      VALUES ?relProp { %s }
+      ?a ?relProp ?b .
+      ?rel wikibase:directClaim ?relProp .
+      SERVICE wikibase:label { bd:serviceParam wikibase:language "[AUTO_LANGUAGE],uz,en,ru". }
+    }
+    """ % (values, values, WIKIDATA_RELATION_PROPS)
+    headers = {
+        'User-Agent': 'LibUZ/1.0 (https://libuz.vercel.app)',
+        'Accept': 'application/sparql-results+json'
+    }
+    try:
+        response = http_client.get("https://query.wikidata.org/sparql", params={'query': query}, headers=headers)
+        if response.status_code == 200:
+            bindings = response.json().get('results', {}).get('bindings', [])
+            WIKIDATA_CACHE[cache_key] = bindings
+            return bindings
+    except Exception as e:
+        print(f"SPARQL Error: {e}")
+    return []
+
+def wikidata_neighbour_graph(main_id, limit=WIKIDATA_NEIGHBOURS):
+    """Nodes and edges for up to `limit` Wikidata entities related to main_id (main_id itself not included).
+
+    Relations among those entities are edges too, so a graph ranked by
+    centrality can tell them apart.
+    """
+    nodes = []
+    edges = []
+    network_data = get_wikidata_network(main_id, limit)
+    if not network_data or 'results' not in network_data or 'bindings' not in network_data['results']:
+        return nodes, edges
+
+    added_nodes = set([main_id])
+    for r in network_data['results']['bindings']:
+        item_id = r.get('item', {}).get('value', '').split('/')[-1]
+        if not item_id or item_id in added_nodes:
+            continue
+            
+        item_label = r.get('itemLabel', {}).get('value', item_id)
+        item_desc = r.get('itemDescription', {}).get('value', '')
+        rel_label = r.get('relLabel', {}).get('value', 'related')
+        direction = r.get('dir', {}).get('value', 'to_item')
+        
+        # Categorize nodes
+        group = "cat_reference" # default
+        if 'influenced by' in rel_label or 'student of' in rel_label or 'educated at' in rel_label:
+            group = "cat_author" # Mentors / Predecessors
+        elif 'influenced' in rel_label:
+            group = "cat_cited_by" # Students / Successors
+        elif 'child' in rel_label or 'spouse' in rel_label or 'father' in rel_label or 'mother' in rel_label or 'relative' in rel_label:
+            group = "category" # Family
+            
+        nodes.append({
+            "id": item_id,
+            "label": item_label[:15] + ".." if len(item_label) > 15 else item_label,
+            "title": f"Munosabat: {rel_label}\nNomi: {item_label}",
+            "group": group,
+            "value": 15,
+            "description": f"{item_label} - {item_desc}",
+            "wikidataUrl": f"https://www.wikidata.org/wiki/{item_id}"
+        })
+        added_nodes.add(item_id)
+        
+        # Edge direction
+        if direction == 'to_item':
+            edges.append({
+                "from": main_id, "to": item_id, "arrows": "to", "label": rel_label
+            })
+        else:
+            edges.append({
+                "from": item_id, "to": main_id, "arrows": "to", "label": rel_label
+            })
+
+    neighbour_ids = [n["id"] for n in nodes]
+    if len(neighbour_ids) > 1:
+        for r in get_wikidata_links(neighbour_ids):
+            a = r.get('a', {}).get('value', '').split('/')[-1]
+            b = r.get('b', {}).get('value', '').split('/')[-1]
+            if a and b and a != b:
+                edges.append({"from": a, "to": b, "arrows": "to", "label": r.get('relLabel', {}).get('value', 'related')})
+    return nodes, edges
+
 @app.route('/api/person_graph/<path:name>', methods=['GET'])
 def get_person_graph(name):
     person_name = urllib.parse.unquote(name).title()
@@ -1375,7 +2334,7 @@ def get_person_graph(name):
                 "color": "#9ca3af"
             })
             
-        return jsonify({
+        return graph_response({
             "nodes": nodes,
             "edges": edges
         })
@@ -1402,53 +2361,12 @@ def get_person_graph(name):
     }]
     edges = []
     
-    # 2. Extract network relationships via SPARQL
-    network_data = get_wikidata_network(main_id)
-    
-    if network_data and 'results' in network_data and 'bindings' in network_data['results']:
-        results = network_data['results']['bindings']
-        added_nodes = set([main_id])
-        
-        for r in results:
-            item_id = r.get('item', {}).get('value', '').split('/')[-1]
-            if not item_id or item_id in added_nodes:
-                continue
-                
-            item_label = r.get('itemLabel', {}).get('value', item_id)
-            item_desc = r.get('itemDescription', {}).get('value', '')
-            rel_label = r.get('relLabel', {}).get('value', 'related')
-            direction = r.get('dir', {}).get('value', 'to_item')
-            
-            # Categorize nodes
-            group = "cat_reference" # default
-            if 'influenced by' in rel_label or 'student of' in rel_label or 'educated at' in rel_label:
-                group = "cat_author" # Mentors / Predecessors
-            elif 'influenced' in rel_label:
-                group = "cat_cited_by" # Students / Successors
-            elif 'child' in rel_label or 'spouse' in rel_label or 'father' in rel_label or 'mother' in rel_label or 'relative' in rel_label:
-                group = "category" # Family
-                
-            nodes.append({
-                "id": item_id,
-                "label": item_label[:15] + ".." if len(item_label) > 15 else item_label,
-                "title": f"Munosabat: {rel_label}\nNomi: {item_label}",
-                "group": group,
-                "value": 15,
-                "description": f"{item_label} - {item_desc}",
-                "wikidataUrl": f"https://www.wikidata.org/wiki/{item_id}"
-            })
-            added_nodes.add(item_id)
-            
-            # Edge direction
-            if direction == 'to_item':
-                edges.append({
-                    "from": main_id, "to": item_id, "arrows": "to", "label": rel_label
-                })
-            else:
-                edges.append({
-                    "from": item_id, "to": main_id, "arrows": "to", "label": rel_label
-                })
-                
+    # 2. Extract network relationships via SPARQL; the most central max_nodes are kept
+    max_nodes = read_int_arg('max_nodes', WIKIDATA_NEIGHBOURS + 1, 1, GRAPH_NODE_LIMIT)
+    more_nodes, more_edges = wikidata_neighbour_graph(main_id, max_nodes * GRAPH_OVERFETCH)
+    nodes.extend(more_nodes)
+    edges.extend(more_edges)
+
     if len(nodes) == 1:
         # No relationships found, add a placeholder node to indicate emptiness
         nodes.append({
@@ -1462,10 +2380,10 @@ def get_person_graph(name):
             "from": main_id, "to": "empty", "arrows": ""
         })
 
-    return jsonify({
+    return graph_response({
         "nodes": nodes,
         "edges": edges
-    })
+    }, max_nodes)
 
 @app.route('/')
 @app.route('/<path:path>')
@@ -0,0 +1,81 @@
+"""Concurrency benchmark: pooled WAL connections (db.Database) vs a new connection per operation.
+
+Usage: python bench_db.py [threads] [ops_per_thread]
+Each thread runs a login/search mix: mostly user lookups, one history
+insert per search. Both setups run on fresh temporary databases with the
+same schema and users.
+"""
+import concurrent.futures
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+from db import QUERIES, Database
+
+SCHEMA = [
+    '''CREATE TABLE users (id INTEGER PRIMARY KEY AUTOINCREMENT, username TEXT UNIQUE NOT NULL,
+                           password TEXT NOT NULL, role TEXT DEFAULT 'user')''',
+    '''CREATE TABLE user_history (id INTEGER PRIMARY KEY AUTOINCREMENT, username TEXT NOT NULL,
+                                  query TEXT NOT NULL, timestamp DATETIME DEFAULT CURRENT_TIMESTAMP)''',
+]
+USERS = [f"user{i}@example.com" for i in range(1000)]
+
+def create(path):
+    conn = sqlite3.connect(path)
+    for statement in SCHEMA:
+        conn.execute(statement)
+    conn.executemany(QUERIES["insert_user"], [(u, "x" * 100, 'user') for u in USERS])
+    conn.commit()
+    conn.close()
+
+def legacy_op(path, write, username):
+    # What the app did before: a new default-journal connection per request
+    conn = sqlite3.connect(path, timeout=30)
+    conn.row_factory = sqlite3.Row
+    if write:
+        conn.execute(QUERIES["insert_history"], (username, "machine learning", time.strftime('%Y-%m-%d %H:%M:%S')))
+        conn.commit()
+    else:
+        conn.execute(QUERIES["user_by_name"], (username,)).fetchone()
+    conn.close()
+
+def pooled_op(db, write, username):
+    if write:
+        db.execute("insert_history", (username, "machine learning", time.strftime('%Y-%m-%d %H:%M:%S')))
+    else:
+        db.one("user_by_name", (username,))
+
+def run(name, op, target, threads, ops, write_ratio=0.3):
+    def worker(seed):
+        rnd = random.Random(seed)
+        latencies = []
+        for _ in range(ops):
+            t = time.perf_counter()
+            op(target, rnd.random() < write_ratio, rnd.choice(USERS))
+            latencies.append(time.perf_counter() - t)
+        return latencies
+
+    start = time.perf_counter()
+    with concurrent.futures.ThreadPoolExecutor(max_workers=threads) as pool:
+        latencies = sorted(l for ls in pool.map(worker, range(threads)) for l in ls)
+    elapsed = time.perf_counter() - start
+    p50 = latencies[len(latencies) // 2] * 1000
+    p99 = latencies[int(len(latencies) * 0.99)] * 1000
+    print(f"{name:<26} {len(latencies) / elapsed:>9.0f} ops/s   p50 {p50:6.2f} ms   p99 {p99:7.2f} ms")
+
+if __name__ == '__main__':
+    threads = int(sys.argv[1]) if len(sys.argv) > 1 else 32
+    ops = int(sys.argv[2]) if len(sys.argv) > 2 else 200
+    print(f"{threads} threads x {ops} ops, 30% writes")
+    with tempfile.TemporaryDirectory() as tmp:
+        legacy_path = os.path.join(tmp, "legacy.db")
+        create(legacy_path)
+        run("connection per operation", legacy_op, legacy_path, threads, ops)
+
+        pooled_path = os.path.join(tmp, "pooled.db")
+        create(pooled_path)
+        db = Database(pooled_path)
+        run("pooled, WAL", pooled_op, db, threads, ops)
+        db.close()
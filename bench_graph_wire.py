@@ -0,0 +1,76 @@
+"""Response size and encode time of the graph endpoints: vis-network JSON vs graph_wire's compact format.
+
+Usage: python bench_graph_wire.py [--live [paper_id ...]]
+  --live  also benchmark paper networks (depth 1-3) fetched from OpenAlex
+Without --live the local graphs are used (author, category and person
+networks from the bundled data) plus depth 1-3 networks of the most cited
+papers already in the local citation store, if any. Sizes are raw and
+gzip-compressed bytes of the response body; encode time covers building
+the wire dict and serialising it with json.dumps.
+"""
+import gzip
+import json
+import sys
+import timeit
+import urllib.parse
+import app
+import graph_wire
+
+DEFAULT_PAPERS = ("W2741809807", "W2100837269")
+
+def graphs_local():
+    for name in app.AUTHOR_SEMANTIC_DATA:
+        yield f"author: {name}", f"/api/author/{urllib.parse.quote(name)}/network"
+    for name in app.CATEGORY_DATA:
+        yield f"category: {name}", f"/api/category/{urllib.parse.quote(name)}/network"
+    for author in app.LOCAL_AUTHORS_DB[:5]:
+        yield f"person: {author['name']}", f"/api/person_graph/{urllib.parse.quote(author['name'])}"
+
+def stored_papers(limit=2):
+    with app.CITATION_STORE.db.connection() as conn:
+        rows = conn.execute('''SELECT id FROM works WHERE referenced_works IS NOT NULL
+                               ORDER BY cited_by_count DESC LIMIT ?''', (limit,)).fetchall()
+    return [row["id"].split("openalex.org/")[-1] for row in rows]
+
+def graphs_papers(paper_ids):
+    for paper_id in paper_ids:
+        for depth in (1, 2, 3):
+            yield f"paper: {paper_id} depth={depth}", f"/api/paper/{paper_id}/network?depth={depth}&max_nodes=1000"
+
+def measure(name, graph):
+    # Flask's jsonify is compact outside debug mode, so both sides drop the spaces
+    plain = json.dumps(graph, ensure_ascii=False, separators=(",", ":")).encode()
+    compact = json.dumps(graph_wire.encode(graph), ensure_ascii=False, separators=(",", ":")).encode()
+    assert graph_wire.decode(json.loads(compact)) == graph, name
+    t_plain = min(timeit.repeat(lambda: json.dumps(graph, ensure_ascii=False, separators=(",", ":")), number=20, repeat=5)) / 20
+    t_compact = min(timeit.repeat(lambda: json.dumps(graph_wire.encode(graph), ensure_ascii=False,
+                                                      separators=(",", ":")), number=20, repeat=5)) / 20
+    print(f"{name[:34]:<34} {len(graph['nodes']):>5} {len(graph['edges']):>5} "
+          f"{len(plain) / 1024:>8.1f} {len(compact) / 1024:>8.1f} "
+          f"{len(gzip.compress(plain)) / 1024:>8.1f} {len(gzip.compress(compact)) / 1024:>8.1f} "
+          f"{t_plain * 1000:>8.2f} {t_compact * 1000:>8.2f}")
+    return len(plain), len(compact)
+
+def run(graphs):
+    client = app.app.test_client()
+    print(f"{'graph':<34} {'nodes':>5} {'edges':>5} {'json KB':>8} {'cmpct KB':>8} "
+          f"{'json gz':>8} {'cmpct gz':>8} {'json ms':>8} {'cmpct ms':>8}")
+    total_plain = total_compact = 0
+    for name, url in graphs:
+        resp = client.get(url)
+        if resp.status_code != 200:
+            print(f"{name[:34]:<34} failed: HTTP {resp.status_code}")
+            continue
+        plain, compact = measure(name, resp.get_json())
+        total_plain += plain
+        total_compact += compact
+    if total_plain:
+        print(f"total {total_plain / 1024:.1f} KB -> {total_compact / 1024:.1f} KB "
+              f"({total_compact / total_plain:.0%})")
+
+if __name__ == '__main__':
+    graphs = list(graphs_local()) + list(graphs_papers(stored_papers()))
+    if '--live' in sys.argv:
+        paper_ids = [a for a in sys.argv[sys.argv.index('--live') + 1:] if not a.startswith('--')]
+        graphs += list(graphs_papers(paper_ids or DEFAULT_PAPERS))
+    run(graphs)
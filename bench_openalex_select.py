@@ -0,0 +1,45 @@
+"""Bytes transferred and JSON decode time of OpenAlex requests with and without `select=`.
+
+Usage: python bench_openalex_select.py [paper_id]
+Needs network access to api.openalex.org. Compares the search request and
+the three request kinds of a paper network (main paper, cited-by, references).
+"""
+import json
+import sys
+import timeit
+import http_client
+from app import OPENALEX_API_URL, OPENALEX_PAGE_SIZE, openalex_url
+
+def measure(url):
+    resp = http_client.get(url)
+    resp.raise_for_status()
+    body = resp.content
+    decode = min(timeit.repeat(lambda: json.loads(body), number=1, repeat=5))
+    return len(body), decode
+
+def compare(name, url, endpoint):
+    try:
+        full_bytes, full_decode = measure(url)
+        sel_bytes, sel_decode = measure(openalex_url(url, endpoint))
+    except Exception as e:
+        print(f"{name:<28} failed: {e}")
+        return
+    print(f"{name:<28} {full_bytes / 1024:>9.1f} KB {sel_bytes / 1024:>9.1f} KB "
+          f"{full_decode * 1000:>9.2f} ms {sel_decode * 1000:>9.2f} ms")
+
+if __name__ == '__main__':
+    paper_id = sys.argv[1] if len(sys.argv) > 1 else "W2741809807"
+    print(f"{'request':<28} {'full':>12} {'select':>12} {'decode':>12} {'decode sel':>12}")
+    compare("search 'machine learning'",
+            f"{OPENALEX_API_URL}/works?per-page={OPENALEX_PAGE_SIZE}&cursor=*&search=\"machine learning\"", "search")
+    compare("search 'alisher navoiy'",
+            f"{OPENALEX_API_URL}/works?per-page={OPENALEX_PAGE_SIZE}&cursor=*&search=\"alisher navoiy\"", "search")
+    compare("paper network: main", f"{OPENALEX_API_URL}/works/{paper_id}", "paper")
+    compare("paper network: cited-by",
+            f"{OPENALEX_API_URL}/works?filter=cites:{paper_id}&per-page=30", "graph")
+    try:
+        refs = http_client.get(openalex_url(f"{OPENALEX_API_URL}/works/{paper_id}", "paper")).json().get("referenced_works", [])[:10]
+    except Exception:
+        refs = []
+    if refs:
+        compare("paper network: reference", f"{OPENALEX_API_URL}/works/{refs[0].split('/')[-1]}", "graph")
@@ -0,0 +1,195 @@
+"""Checks ranking.rank_results against the old per-row scorer and times both.
+
+Usage: python bench_ranking.py
+Builds a deterministic fixture of search results, verifies that buckets,
+order, nlp_score, hybrid_score and match_reason are identical, then times
+both scorers as the page size grows from 40 to a few hundred.
+The comparison runs without user history: the old scorer matched raw past
+queries by substring, the new one reads a decayed term-weight profile.
+"""
+import copy
+import random
+import timeit
+from ranking import normalize_text, letter_normalize, is_exact_word, SYNONYMS, rank_results
+from translit import transliterate
+
+def legacy_rank_results(results, query, user_past_queries):
+    # Previous per-row scorer from app.py, kept verbatim as the reference
+    max_cites = max([int(r.get('cited_by_count') or 0) for r in results] + [1])
+    max_rel = max([float(r.get('relevance_score') or 0) for r in results] + [1.0])
+
+    exact_matches = []
+    related_results = []
+    recommended = []
+
+    # NLP Base Prep
+    q_norm = normalize_text(query)
+    q_translit = normalize_text(transliterate(query))
+    q_letter_norm = letter_normalize(q_translit)
+    q_words = set(q_norm.split())
+    q_synonyms = set()
+    for w in q_words:
+        if w in SYNONYMS:
+            q_synonyms.add(SYNONYMS[w])
+
+    for r in results:
+        t_orig = r.get("original_title", "")
+        d_orig = r.get("description", "")
+
+        t_norm = normalize_text(t_orig)
+        d_norm = normalize_text(d_orig)
+        tags_orig = r.get("tags", [])
+
+        nlp_score = 0
+        reasons = []
+
+        def check_match(text, weight_name, multiplier):
+            nonlocal nlp_score
+            if not text: return
+
+            text_norm = normalize_text(text)
+            text_lat = normalize_text(transliterate(text))
+            text_let_norm = letter_normalize(text_lat)
+
+            # Exact script word match
+            if is_exact_word(q_norm, text_norm):
+                nlp_score += 5 * multiplier
+                reasons.append(f"Exact match (+5) in {weight_name}")
+            # Translit word match
+            elif is_exact_word(q_translit, text_lat) and q_translit != q_norm:
+                nlp_score += 4 * multiplier
+                reasons.append(f"Translit match (+4) in {weight_name}")
+            # Phonetic/Normalized word match
+            elif is_exact_word(q_letter_norm, text_let_norm) and q_letter_norm != q_translit:
+                nlp_score += 4 * multiplier
+                reasons.append(f"Normalized match (+4) in {weight_name}")
+            # Synonyms
+            else:
+                syn_matched = False
+                for syn in q_synonyms:
+                    if is_exact_word(syn, text_norm) or is_exact_word(syn, text_lat):
+                        nlp_score += 3 * multiplier
+                        reasons.append(f"Synonym '{syn}' (+3) in {weight_name}")
+                        syn_matched = True
+                        break
+                # Partial
+                if not syn_matched:
+                    for w in q_words:
+                        if len(w) > 3 and (w in text_norm or w in text_lat or letter_normalize(w) in text_let_norm):
+                            nlp_score += 2 * multiplier
+                            reasons.append(f"Partial '{w}' (+2) in {weight_name}")
+                            break
+
+        check_match(t_orig, "Title", 3)
+        check_match(d_orig, "Description", 2)
+        for tag in tags_orig:
+            check_match(tag, "Tags", 1)
+
+        # Filter repeated reasons
+        unique_reasons = []
+        for reason in reasons:
+            if reason not in unique_reasons: unique_reasons.append(reason)
+
+        r["match_reason"] = " | ".join(unique_reasons) if unique_reasons else "Semantic vector API fallback"
+        r["nlp_score"] = nlp_score
+
+        # Blend into hybrid API score
+        api_rel = float(r.get("relevance_score") or 0) / max_rel
+        norm_nlp = min(1.0, nlp_score / 15.0)
+        final_rel = max(api_rel, norm_nlp)
+
+        pop = float(r.get("cited_by_count", 0) or 0) / max_cites
+
+        year = r.get("publication_year")
+        if not str(year).isdigit(): year = 2000
+        year = int(year)
+        rec = max(0, min(1, (year - 1950) / 75.0))
+
+        u_int = 0
+        for pq in user_past_queries:
+            if normalize_text(pq) in t_norm or normalize_text(pq) in q_norm:
+                u_int += 0.2
+        u_int = min(1.0, u_int)
+
+        final_score = (0.5 * final_rel) + (0.2 * pop) + (0.2 * rec) + (0.1 * u_int)
+        r["hybrid_score"] = float(f"{final_score:.3f}")
+        r["score"] = r["hybrid_score"] # Explicit score key mapping as requested
+
+        if nlp_score >= 15 or final_rel > 0.85 or (q_norm and q_norm == t_norm):
+            exact_matches.append(r)
+        elif nlp_score > 0 or final_rel > 0.4:
+            related_results.append(r)
+        else:
+            recommended.append(r)
+
+    exact_matches.sort(key=lambda x: x["hybrid_score"], reverse=True)
+    related_results.sort(key=lambda x: x["hybrid_score"], reverse=True)
+    recommended.sort(key=lambda x: x["hybrid_score"], reverse=True)
+
+    if not recommended and len(related_results) > 6:
+        split_idx = len(related_results) // 2
+        recommended = related_results[split_idx:]
+        related_results = related_results[:split_idx]
+
+    if not related_results and len(recommended) > 6:
+        split_idx = len(recommended) // 2
+        related_results = recommended[:split_idx]
+        recommended = recommended[split_idx:]
+
+    return {
+        "exact_matches": exact_matches,
+        "related_results": related_results,
+        "recommended": recommended
+    }
+
+WORDS = ["machine", "learning", "navoiy", "alisher", "iqtisodiyot", "economics", "kitob", "book",
+         "tarix", "history", "o'qituvchi", "teacher", "ta'lim", "education", "tibbiyot", "medicine",
+         "neural", "network", "Навоий", "ҳаёти", "ижоди", "adabiyot", "poetry", "analysis", "study"]
+TAGS = ["Computer science", "Economics", "Medicine", "History", "Literature", "Philosophy",
+        "Artificial intelligence", "Education", "Психология", "Tarix"]
+QUERIES = ["machine learning", "alisher navoiy", "iqtisodiyot", "kitob", "Навоий", "o'qituvchi", "tarix"]
+PAST_QUERIES = ["machine learning", "navoiy", "tarix", "economics", "kitob"]
+USER_INTEREST = {"machine": 1.0, "learning": 1.0, "navoiy": 0.8, "tarix": 0.5, "economics": 0.3, "kitob": 0.2}
+
+def fixture(n, seed=42):
+    rnd = random.Random(seed)
+    results = []
+    for i in range(n):
+        title = " ".join(rnd.choice(WORDS) for _ in range(rnd.randint(2, 8)))
+        results.append({
+            "id": f"W{i}",
+            "original_title": title.capitalize(),
+            "description": "",
+            "tags": rnd.sample(TAGS, rnd.randint(0, 5)),
+            "publication_year": rnd.choice([rnd.randint(1900, 2025), "N/A", None]),
+            "cited_by_count": rnd.choice([0, rnd.randint(0, 5000)]),
+            "relevance_score": rnd.choice([0.0, rnd.uniform(0, 300), 100.0, 50.0]),
+        })
+    return results
+
+def summary(ranked):
+    return {bucket: [(r["id"], r["nlp_score"], r["hybrid_score"], r["match_reason"]) for r in items]
+            for bucket, items in ranked.items()}
+
+def check(n=400):
+    mismatches = 0
+    for query in QUERIES:
+        results = fixture(n)
+        old = summary(legacy_rank_results(copy.deepcopy(results), query, []))
+        new = summary(rank_results(copy.deepcopy(results), query))
+        if old != new:
+            mismatches += 1
+            print(f"MISMATCH for query={query!r}")
+    print(f"{len(QUERIES)} fixture rankings compared, {mismatches} mismatches")
+
+def bench():
+    print(f"{'per-page':>8} {'legacy ms':>10} {'numpy ms':>10}")
+    for n in (40, 100, 200, 400):
+        results = fixture(n)
+        old = min(timeit.repeat(lambda: legacy_rank_results(copy.deepcopy(results), "machine learning", USER_INTEREST), number=1, repeat=5))
+        new = min(timeit.repeat(lambda: rank_results(copy.deepcopy(results), "machine learning", USER_INTEREST), number=1, repeat=5))
+        print(f"{n:>8} {old * 1000:>10.2f} {new * 1000:>10.2f}")
+
+if __name__ == '__main__':
+    check()
+    bench()
@@ -0,0 +1,83 @@
+"""Micro-benchmark: translit.transliterate vs the old per-call uz_transliterate.
+
+Usage: python bench_translit.py [--live]
+  --live  also benchmark on live OpenAlex titles for a few popular queries
+"""
+import json
+import sys
+import timeit
+from translit import transliterate, transliterate_many
+
+def legacy_uz_transliterate(text):
+    # Previous implementation from app.py, kept verbatim as the baseline
+    if not text: return text
+
+    l2c = {
+        "sh": "ш", "ch": "ч", "ya": "я", "yo": "ё", "yu": "ю", "o'": "ў", "g'": "ғ",
+        "shch": "щ",
+        "a": "а", "b": "б", "d": "д", "e": "е", "f": "ф", "g": "г", "h": "ҳ",
+        "i": "и", "j": "ж", "k": "к", "l": "л", "m": "м", "n": "н", "o": "о",
+        "p": "п", "q": "қ", "r": "р", "s": "с", "t": "т", "u": "у", "v": "в",
+        "x": "х", "y": "й", "z": "з", "c": "ц",
+        "SH": "Ш", "CH": "Ч", "YA": "Я", "YO": "Ё", "YU": "Ю", "O'": "Ў", "G'": "Ғ",
+        "A": "А", "B": "Б", "D": "Д", "E": "Е", "F": "Ф", "G": "Г", "H": "Ҳ",
+        "I": "И", "J": "Ж", "K": "К", "L": "Л", "M": "М", "N": "Н", "O": "О",
+        "P": "П", "Q": "Қ", "R": "Р", "S": "С", "T": "Т", "U": "У", "V": "В",
+        "X": "Х", "Y": "Й", "Z": "З", "C": "Ц", "'": "ъ"
+    }
+    c2l = {v: k for k, v in l2c.items()}
+    c2l['э'] = 'e'
+    c2l['Э'] = 'E'
+    c2l['ы'] = 'y'
+    c2l['Ы'] = 'Y'
+
+    is_cyrillic = any('\u0400' <= char <= '\u04FF' for char in text)
+    res = text
+
+    if is_cyrillic:
+        for cyr, lat in sorted(c2l.items(), key=lambda x: len(x[0]), reverse=True):
+            res = res.replace(cyr, lat)
+    else:
+        for lat, cyr in sorted(l2c.items(), key=lambda x: len(x[0]), reverse=True):
+            res = res.replace(lat, cyr)
+
+    return res
+
+def local_titles():
+    with open('local_authors.json', 'r', encoding='utf-8') as f:
+        authors = json.load(f)
+    titles = []
+    for a in authors:
+        titles.append(a.get('name', ''))
+        alias = a.get('alias')
+        if alias:
+            titles.append(" ".join(alias) if isinstance(alias, list) else str(alias))
+        works = a.get('works', [])
+        titles.extend(works if isinstance(works, list) else works.split(','))
+    # Latin-script strings too, so both directions are measured
+    titles.extend(legacy_uz_transliterate(t) for t in list(titles))
+    return [t for t in titles if t]
+
+def live_titles(queries=("machine learning", "alisher navoiy", "iqtisodiyot", "tibbiyot")):
+    import http_client
+    titles = []
+    for q in queries:
+        resp = http_client.get(f"https://api.openalex.org/works?search={q}&per-page=40")
+        if resp.status_code == 200:
+            for w in resp.json().get('results', []):
+                titles.append(w.get('title') or '')
+                titles.extend(c.get('display_name', '') for c in w.get('concepts', [])[:5])
+    return [t for t in titles if t]
+
+def run(name, titles, repeat=5):
+    mismatches = sum(1 for t in titles if transliterate(t) != legacy_uz_transliterate(t))
+    old = min(timeit.repeat(lambda: [legacy_uz_transliterate(t) for t in titles], number=1, repeat=repeat))
+    new = min(timeit.repeat(lambda: transliterate_many(titles), number=1, repeat=repeat))
+    print(f"{name}: {len(titles)} strings, {mismatches} outputs differ")
+    print(f"  legacy uz_transliterate : {old * 1000:8.2f} ms")
+    print(f"  translit.transliterate  : {new * 1000:8.2f} ms  ({old / new:.1f}x faster)")
+
+if __name__ == '__main__':
+    run("local_authors.json", local_titles())
+    if '--live' in sys.argv:
+        run("OpenAlex titles", live_titles())
@@ -0,0 +1,127 @@
+"""Local citation adjacency store (SQLite) filled from OpenAlex responses.
+
+Every work the graph endpoints fetch is kept with its metadata, and every
+citation seen (a work's referenced_works, or a citing-works query) becomes
+an edge. `citations` records which works had their citing works fetched and
+how many, so a later request can tell whether the stored list is complete
+enough to answer it without OpenAlex.
+"""
+import json
+import sqlite3
+import time
+from db import QUERIES
+
+SCHEMA = [
+    # referenced_works is NULL when the work was fetched without it
+    '''CREATE TABLE IF NOT EXISTS works
+       (id TEXT PRIMARY KEY,
+        title TEXT,
+        publication_year INTEGER,
+        cited_by_count INTEGER DEFAULT 0,
+        authorships TEXT,
+        referenced_works TEXT,
+        fetched_at REAL NOT NULL)''',
+    '''CREATE TABLE IF NOT EXISTS edges
+       (citing TEXT NOT NULL,
+        cited TEXT NOT NULL,
+        PRIMARY KEY (citing, cited)) WITHOUT ROWID''',
+    "CREATE INDEX IF NOT EXISTS idx_edges_cited ON edges (cited, citing)",
+    # Citing works of `id` were fetched at fetched_at, `requested` asked for, `count` returned
+    '''CREATE TABLE IF NOT EXISTS citations
+       (id TEXT PRIMARY KEY,
+        requested INTEGER NOT NULL,
+        count INTEGER NOT NULL,
+        fetched_at REAL NOT NULL)''',
+]
+
+def _authorships(work):
+    # Only what the graph labels use
+    return [{"author": {"id": (a.get("author") or {}).get("id"),
+                        "display_name": (a.get("author") or {}).get("display_name")}}
+            for a in work.get("authorships") or []]
+
+class CitationStore:
+    """Works and citation edges on a db.Database pool (a file of their own, not the users database)."""
+
+    def __init__(self, db):
+        self.db = db
+        self.stats = {"work_hits": 0, "work_misses": 0, "citation_hits": 0, "citation_misses": 0}
+        with db.connection() as conn:
+            for statement in SCHEMA:
+                conn.execute(statement)
+
+    def save_works(self, works, now=None):
+        """Stores works (OpenAlex shape) and an edge for each of their referenced_works."""
+        now = now or time.time()
+        rows, edges = [], []
+        for w in works:
+            if not w.get("id"):
+                continue
+            refs = w.get("referenced_works")
+            rows.append((w["id"], w.get("title"), w.get("publication_year"), w.get("cited_by_count") or 0,
+                         json.dumps(_authorships(w), ensure_ascii=False),
+                         json.dumps(refs) if refs is not None else None, now))
+            edges.extend((w["id"], ref) for ref in refs or [])
+        try:
+            with self.db.connection() as conn:
+                conn.executemany(QUERIES["citation_upsert_work"], rows)
+                conn.executemany(QUERIES["citation_insert_edge"], edges)
+        except sqlite3.Error as e:
+            print(f"Citation store write error: {e}")
+
+    def save_citations(self, work_id, citing_works, requested, now=None):
+        """Stores the result of a citing-works query for one work."""
+        now = now or time.time()
+        self.save_works(citing_works, now)
+        try:
+            with self.db.connection() as conn:
+                conn.executemany(QUERIES["citation_insert_edge"],
+                                 [(w["id"], work_id) for w in citing_works if w.get("id")])
+                conn.execute(QUERIES["citation_put_query"], (work_id, requested, len(citing_works), now))
+        except sqlite3.Error as e:
+            print(f"Citation store write error: {e}")
+
+    def get_works(self, ids, with_references=False):
+        """{id: (work, fetched_at)} for stored works; with_references skips works stored without referenced_works."""
+        if not ids:
+            return {}
+        try:
+            rows = self.db.all("citation_works_with_refs" if with_references else "citation_works",
+                               (json.dumps(list(ids)),))
+        except sqlite3.Error as e:
+            print(f"Citation store read error: {e}")
+            return {}
+        self.stats["work_hits"] += len(rows)
+        self.stats["work_misses"] += len(set(ids)) - len(rows)
+        return {row["id"]: (self._to_work(row), row["fetched_at"]) for row in rows}
+
+    def get_citing(self, work_id, limit):
+        """(works citing work_id, most cited first, fetched_at) if a stored query covers `limit`, else None."""
+        try:
+            with self.db.connection() as conn:
+                mark = conn.execute(QUERIES["citation_query"], (work_id,)).fetchone()
+                # Covered if that query asked for at least as many, or returned every citing work there was
+                if mark is None or (mark["requested"] < limit and mark["count"] >= mark["requested"]):
+                    self.stats["citation_misses"] += 1
+                    return None
+                rows = conn.execute(QUERIES["citation_citing"], (work_id, limit)).fetchall()
+        except sqlite3.Error as e:
+            print(f"Citation store read error: {e}")
+            return None
+        self.stats["citation_hits"] += 1
+        return [self._to_work(row) for row in rows], mark["fetched_at"]
+
+    def counts(self):
+        return dict(self.db.one("citation_counts"))
+
+    def _to_work(self, row):
+        work = {
+            "id": row["id"],
+            "title": row["title"],
+            "publication_year": row["publication_year"],
+            "cited_by_count": row["cited_by_count"],
+            "authorships": json.loads(row["authorships"] or "[]"),
+        }
+        if row["referenced_works"] is not None:
+            work["referenced_works"] = json.loads(row["referenced_works"])
+        return work
@@ -0,0 +1,137 @@
+import queue
+import sqlite3
+from contextlib import contextmanager
+
+# WAL lets readers run while a write is in progress; with WAL, synchronous=NORMAL
+# only syncs at checkpoints and is still safe against application crashes.
+PRAGMAS = [
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA busy_timeout=5000",
+    "PRAGMA cache_size=-16000",      # 16 MB page cache per connection
+    "PRAGMA mmap_size=134217728",    # 128 MB memory-mapped reads
+    "PRAGMA temp_store=MEMORY",
+]
+
+# Every statement the app runs against the users database. The SQL text is
+# fixed, so each pooled connection's statement cache keeps them prepared.
+QUERIES = {
+    # users
+    "user_by_name": "SELECT * FROM users WHERE username = ?",
+    "insert_user": "INSERT INTO users (username, password, role) VALUES (?, ?, ?)",
+    # admin listing: keyset pages on id, role over idx_users_role_id; prefix searches page on
+    # (lower(username), id) over idx_users_username_lower_id, so no page sorts its matches
+    "users_page": "SELECT id, username, role FROM users WHERE id > ? ORDER BY id LIMIT ?",
+    "users_page_role": "SELECT id, username, role FROM users WHERE role = ? AND id > ? ORDER BY id LIMIT ?",
+    "users_page_prefix": '''SELECT id, username, role, lower(username) AS name_key FROM users INDEXED BY idx_users_username_lower_id
+                            WHERE lower(username) >= ? AND lower(username) < ? AND (lower(username) > ? OR id > ?)
+                            ORDER BY lower(username), id LIMIT ?''',
+    "users_page_prefix_role": '''SELECT id, username, role, lower(username) AS name_key FROM users INDEXED BY idx_users_username_lower_id
+                                 WHERE lower(username) >= ? AND lower(username) < ? AND (lower(username) > ? OR id > ?)
+                                 AND role = ?
+                                 ORDER BY lower(username), id LIMIT ?''',
+    "user_counts": "SELECT role, count FROM user_counts WHERE count > 0",
+    "count_users_prefix": "SELECT COUNT(*) FROM users WHERE lower(username) >= ? AND lower(username) < ?",
+    "count_users_prefix_role": "SELECT COUNT(*) FROM users WHERE lower(username) >= ? AND lower(username) < ? AND role = ?",
+    "delete_user": "DELETE FROM users WHERE id = ?",
+    # search history and interest profiles
+    "insert_history": "INSERT INTO user_history (username, query, timestamp) VALUES (?, ?, ?)",
+    "user_interest": "SELECT term, weight, updated_at FROM user_interest WHERE username = ?",
+    "upsert_interest": "INSERT OR REPLACE INTO user_interest (username, term, weight, updated_at) VALUES (?, ?, ?, ?)",
+    "delete_interest": "DELETE FROM user_interest WHERE username = ? AND term = ?",
+    "rollup_history": '''INSERT INTO user_history_daily (username, query, day, count)
+                         SELECT username, query, date(timestamp), COUNT(*) FROM user_history
+                         WHERE timestamp < ? GROUP BY username, query, date(timestamp)
+                         ON CONFLICT (username, query, day) DO UPDATE SET count = count + excluded.count''',
+    "delete_history_before": "DELETE FROM user_history WHERE timestamp < ?",
+    # one-time login codes (otp_store.SqliteOTPStore)
+    "otp_put": "INSERT OR REPLACE INTO otp_codes (email, otp, expires) VALUES (?, ?, ?)",
+    "otp_get": "SELECT otp, expires FROM otp_codes WHERE email = ?",
+    "otp_delete": "DELETE FROM otp_codes WHERE email = ?",
+    "otp_sweep": "DELETE FROM otp_codes WHERE expires < ?",
+    "otp_count": "SELECT COUNT(*) FROM otp_codes",
+    # citation graph (citation_store.CitationStore, its own database file); a refetch without
+    # referenced_works or publication_year keeps what was stored earlier
+    "citation_upsert_work": '''INSERT INTO works (id, title, publication_year, cited_by_count, authorships,
+                                                  referenced_works, fetched_at)
+                               VALUES (?, ?, ?, ?, ?, ?, ?)
+                               ON CONFLICT (id) DO UPDATE SET
+                                 title = excluded.title,
+                                 publication_year = COALESCE(excluded.publication_year, works.publication_year),
+                                 cited_by_count = excluded.cited_by_count, authorships = excluded.authorships,
+                                 referenced_works = COALESCE(excluded.referenced_works, works.referenced_works),
+                                 fetched_at = excluded.fetched_at''',
+    "citation_insert_edge": "INSERT OR IGNORE INTO edges (citing, cited) VALUES (?, ?)",
+    "citation_put_query": "INSERT OR REPLACE INTO citations (id, requested, count, fetched_at) VALUES (?, ?, ?, ?)",
+    # ids as one JSON array, so the statement text does not depend on how many there are
+    "citation_works": "SELECT * FROM works WHERE id IN (SELECT value FROM json_each(?))",
+    "citation_works_with_refs": '''SELECT * FROM works WHERE id IN (SELECT value FROM json_each(?))
+                                   AND referenced_works IS NOT NULL''',
+    "citation_query": "SELECT requested, count, fetched_at FROM citations WHERE id = ?",
+    "citation_citing": '''SELECT w.* FROM edges e JOIN works w ON w.id = e.citing
+                          WHERE e.cited = ? ORDER BY w.cited_by_count DESC, w.id LIMIT ?''',
+    "citation_counts": '''SELECT (SELECT COUNT(*) FROM works) AS works, (SELECT COUNT(*) FROM edges) AS edges,
+                                 (SELECT COUNT(*) FROM citations) AS citations''',
+}
+
+class Database:
+    """Thread-safe pool of SQLite connections with WAL and tuned pragmas.
+
+    Connections are opened lazily up to `size` and handed out one per caller;
+    callers beyond that wait for a free one. Queries are referenced by name
+    from QUERIES.
+    """
+
+    def __init__(self, path, size=8):
+        self.path = path
+        self.size = size
+        self._idle = queue.LifoQueue()
+        self._slots = queue.Queue()
+        for _ in range(size):
+            self._slots.put(None)
+
+    def _open(self):
+        conn = sqlite3.connect(self.path, check_same_thread=False, cached_statements=len(QUERIES) * 2)
+        conn.row_factory = sqlite3.Row
+        for pragma in PRAGMAS:
+            conn.execute(pragma)
+        return conn
+
+    @contextmanager
+    def connection(self):
+        """A pooled connection; the block is one transaction (committed on success, rolled back on error)."""
+        self._slots.get()
+        try:
+            conn = self._idle.get_nowait()
+        except queue.Empty:
+            try:
+                conn = self._open()
+            except Exception:
+                self._slots.put(None)
+                raise
+        try:
+            with conn:
+                yield conn
+        finally:
+            self._idle.put(conn)
+            self._slots.put(None)
+
+    def one(self, name, args=()):
+        with self.connection() as conn:
+            return conn.execute(QUERIES[name], args).fetchone()
+
+    def all(self, name, args=()):
+        with self.connection() as conn:
+            return conn.execute(QUERIES[name], args).fetchall()
+
+    def execute(self, name, args=()):
+        """Runs one write in its own transaction and returns the number of rows changed."""
+        with self.connection() as conn:
+            return conn.execute(QUERIES[name], args).rowcount
+
+    def close(self):
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                return
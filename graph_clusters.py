@@ -0,0 +1,138 @@
+"""Community detection and cluster collapsing for vis-network graphs (NumPy).
+
+label_propagation() runs on the undirected edge arrays: every node takes
+the label most common among its neighbours (ties broken at random), and
+each round only a random half of the nodes update, which keeps the labels
+from oscillating on bipartite parts of a citation graph. Label propagation
+tends to split a dense community between a few labels that grew at once, so
+merge_communities() then joins communities pairwise while that raises
+modularity, as in the aggregation phase of Louvain.
+
+collapse() folds every community of at least CLUSTER_MIN_SIZE nodes into
+one cluster node carrying its member count, and merges the edges between
+two clusters (or a cluster and a node) into one edge with a "value" of how
+many it stands for. Fixed nodes (the main paper) are never folded. The
+members of each cluster are returned separately so an endpoint can hand
+them out when the client expands the cluster.
+"""
+import numpy as np
+from graph_analytics import edge_arrays
+
+CLUSTER_MIN_SIZE = 5
+LABEL_PROPAGATION_ROUNDS = 30
+
+def label_propagation(n, src, dst, seed=0, rounds=LABEL_PROPAGATION_ROUNDS):
+    """Community label per node; isolated nodes keep a label of their own."""
+    labels = np.arange(n)
+    if n == 0 or len(src) == 0:
+        return labels
+    rng = np.random.default_rng(seed)
+    u = np.concatenate([src, dst])
+    v = np.concatenate([dst, src])
+    has_neighbours = np.bincount(u, minlength=n) > 0
+    for _ in range(rounds):
+        # (node, neighbour label) counts; the winner per node is its most frequent label,
+        # its current one if that is among the most frequent, else a random one of them
+        pair, count = np.unique(u * n + labels[v], return_counts=True)
+        node, label = np.divmod(pair, n)
+        order = np.lexsort((rng.random(len(pair)), labels[node] != label, -count, node))
+        first = np.ones(len(order), dtype=bool)
+        first[1:] = node[order][1:] != node[order][:-1]
+        best = np.full(n, -1)
+        best[node[order][first]] = label[order][first]
+        if not (has_neighbours & (best != labels)).any():
+            break
+        update = has_neighbours & (rng.random(n) < 0.5)
+        labels = np.where(update, best, labels)
+    return labels
+
+def merge_communities(labels, src, dst):
+    """Greedily merges communities while modularity increases; returns labels 0..k-1."""
+    _, labels = np.unique(labels, return_inverse=True)
+    if len(src) == 0:
+        return labels
+    m = len(src)
+    while True:
+        k = labels.max() + 1
+        # weight[i, j]: edges between communities i and j, each edge counted once per direction
+        weight = np.bincount(np.concatenate([labels[src] * k + labels[dst], labels[dst] * k + labels[src]]),
+                             minlength=k * k).reshape(k, k).astype(float)
+        share = weight.sum(1) / (2 * m)
+        gain = weight / m - 2 * np.outer(share, share)
+        np.fill_diagonal(gain, -np.inf)
+        gain[weight == 0] = -np.inf
+        i, j = np.unravel_index(np.argsort(gain, axis=None)[::-1], gain.shape)
+        positive = gain[i, j] > 0
+        if not positive.any():
+            return labels
+        # Best pairs first, each community in at most one merge per round
+        target = np.arange(k)
+        used = np.zeros(k, dtype=bool)
+        for a, b in zip(i[positive], j[positive]):
+            if not used[a] and not used[b]:
+                used[a] = used[b] = True
+                target[b] = a
+        _, labels = np.unique(target[labels], return_inverse=True)
+
+def collapse(graph, cluster_prefix, min_size=CLUSTER_MIN_SIZE, seed=0):
+    """Folds communities into cluster nodes.
+
+    Returns (graph, clusters): graph with "clusters" (how many were folded)
+    set when any were, and clusters = {cluster id: {"nodes": members,
+    "edges": every original edge touching a member, "clusters": {node id:
+    cluster id} for edge endpoints that sit in another cluster}}.
+    """
+    nodes, edges = graph["nodes"], graph["edges"]
+    src, dst = edge_arrays(nodes, edges)
+    labels = merge_communities(label_propagation(len(nodes), src, dst, seed=seed), src, dst)
+
+    members = {}
+    for i, node in enumerate(nodes):
+        if not node.get("fixed"):
+            members.setdefault(int(labels[i]), []).append(node)
+    cluster_of = {}
+    clusters = {}
+    for number, (label, group) in enumerate(sorted(((l, g) for l, g in members.items() if len(g) >= min_size),
+                                                    key=lambda item: -len(item[1]))):
+        cluster_id = f"{cluster_prefix}_{number}"
+        clusters[cluster_id] = {"nodes": group, "edges": [], "clusters": {}}
+        for node in group:
+            cluster_of[node.get("id")] = cluster_id
+    if not clusters:
+        return graph, {}
+
+    merged = {}
+    kept_edges = []
+    for edge in edges:
+        a, b = edge.get("from"), edge.get("to")
+        ca, cb = cluster_of.get(a), cluster_of.get(b)
+        for cid in {ca, cb} - {None}:
+            clusters[cid]["edges"].append(edge)
+            for end in (a, b):
+                if end in cluster_of and cluster_of[end] != cid:
+                    clusters[cid]["clusters"][end] = cluster_of[end]
+        if not ca and not cb:
+            kept_edges.append(edge)
+        elif ca != cb:
+            key = (ca or a, cb or b)
+            merged[key] = merged.get(key, 0) + 1
+
+    cluster_nodes = []
+    for cluster_id, cluster in clusters.items():
+        group = cluster["nodes"]
+        lead = max(group, key=lambda node: node.get("centrality", 0))
+        cluster_nodes.append({
+            "id": cluster_id,
+            "label": f"{lead.get('label', '')} +{len(group) - 1}",
+            "title": f"Klaster: {len(group)} ta tugun",
+            "group": "cluster",
+            "value": sum(node.get("value", 1) for node in group),
+            "members": len(group),
+            "centrality": lead.get("centrality", 0),
+        })
+    out = dict(graph)
+    out["nodes"] = [node for node in nodes if node.get("id") not in cluster_of] + cluster_nodes
+    out["edges"] = kept_edges + [{"from": a, "to": b, "arrows": "to", "value": count,
+                                  "title": f"{count} ta bog'lanish"} for (a, b), count in merged.items()]
+    out["clusters"] = len(clusters)
+    return out, clusters
@@ -0,0 +1,212 @@
+"""Server-side force-directed layout for vis-network graphs (NumPy).
+
+Fruchterman-Reingold style: every pair of nodes repels with k²/d, every edge
+pulls with d²/k, a weak gravity keeps disconnected parts together, and the
+step size cools linearly. Up to LAYOUT_EXACT_LIMIT nodes the repulsion is
+computed exactly over all pairs; above that it uses two grid levels, as a
+two-level Barnes-Hut: nodes in the 3x3 fine cells around a node repel it
+exactly; farther fine cells inside the neighbouring coarse blocks, and all
+coarse blocks beyond those, act as point masses at their centroids. That
+far-field force is computed once per fine cell and shared by its nodes.
+Fine cell edges sit at quantiles of each axis rather than evenly across the
+bounding box, so a dense core does not pile most nodes into a few cells.
+With about n/4 fine cells and sqrt(n/4) coarse blocks, an iteration costs
+about n·sqrt(n) instead of n².
+
+Nodes with "fixed" coordinates (the main paper at 0,0) stay where they are.
+Layouts depend only on node ids, fixed positions and edges, so they are
+cached under graph_key() and a repeat view gets the same coordinates.
+"""
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+import numpy as np
+
+LAYOUT_EXACT_LIMIT = 400
+LAYOUT_ITERATIONS = 60
+SPRING_LENGTH = 150.0     # vis-network's springLength in the paper graph options
+GRAVITY = 0.5
+GRID_CELL_NODES = 4       # average nodes per grid cell in the approximated repulsion
+MIN_DISTANCE2 = 1.0
+
+def graph_key(nodes, edges):
+    """Content hash of what the layout depends on."""
+    h = hashlib.sha1()
+    for node in nodes:
+        fixed = (node.get("x"), node.get("y")) if node.get("fixed") else None
+        h.update(json.dumps([str(node.get("id")), fixed]).encode())
+    h.update(b"|")
+    for edge in edges:
+        h.update(json.dumps([str(edge.get("from")), str(edge.get("to"))]).encode())
+    return h.hexdigest()
+
+def _repulsion_exact(pos, k2):
+    dx = pos[:, 0, None] - pos[None, :, 0]
+    dy = pos[:, 1, None] - pos[None, :, 1]
+    d2 = dx * dx + dy * dy
+    np.fill_diagonal(d2, np.inf)
+    w = k2 / np.maximum(d2, MIN_DISTANCE2)
+    return np.stack([(dx * w).sum(1), (dy * w).sum(1)], 1)
+
+def _pairs(keys, cells_x, cells_y, g):
+    """Index pairs (i, j) of items whose grid cells are within one cell of each other.
+
+    keys[i] = cells_x[i] * g + cells_y[i]; items are read back sorted by key,
+    so the cost is the number of pairs, not the square of the item count.
+    """
+    count = np.bincount(keys, minlength=g * g)
+    order = np.argsort(keys, kind="stable")
+    starts = np.cumsum(count) - count
+    all_i, all_j = [], []
+    for dx in (-1, 0, 1):
+        for dy in (-1, 0, 1):
+            nx, ny = cells_x + dx, cells_y + dy
+            ok = (nx >= 0) & (nx < g) & (ny >= 0) & (ny < g)
+            i = np.nonzero(ok)[0]
+            other = nx[ok] * g + ny[ok]
+            sizes = count[other]
+            if not sizes.sum():
+                continue
+            offsets = np.arange(sizes.sum()) - np.repeat(np.cumsum(sizes) - sizes, sizes)
+            all_i.append(np.repeat(i, sizes))
+            all_j.append(order[np.repeat(starts[other], sizes) + offsets])
+    if not all_i:
+        return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+    return np.concatenate(all_i), np.concatenate(all_j)
+
+def _accumulate(n, i, j, pos_i, pos_j, weight_j, k2):
+    """Per-i sum of the repulsion k2·w_j·(p_i - p_j)/d² over the pairs (i, j)."""
+    d = pos_i - pos_j
+    w = weight_j * k2 / np.maximum((d ** 2).sum(1), MIN_DISTANCE2)
+    return np.stack([np.bincount(i, weights=d[:, 0] * w, minlength=n),
+                     np.bincount(i, weights=d[:, 1] * w, minlength=n)], 1)
+
+def _repulsion_grid(pos, k2):
+    n = len(pos)
+    g = max(2, int(np.ceil(np.sqrt(n / GRID_CELL_NODES))))
+    # Cell edges at quantiles of each axis (by rank), so every row and column holds
+    # about n/g nodes even when the layout crowds them into a dense core
+    cell_xy = pos.argsort(0, kind="stable").argsort(0, kind="stable") * g // n
+    cell = cell_xy[:, 0] * g + cell_xy[:, 1]
+
+    # Occupied fine cells as point masses at their centroids
+    occupied, node_cell = np.unique(cell, return_inverse=True)
+    mass = np.bincount(node_cell).astype(float)
+    centre = np.stack([np.bincount(node_cell, weights=pos[:, 0]),
+                       np.bincount(node_cell, weights=pos[:, 1])], 1) / mass[:, None]
+    fx, fy = np.divmod(occupied, g)
+    m = len(occupied)
+
+    # Coarse grid of about sqrt(g) x sqrt(g) blocks of fine cells, also as point masses
+    block = max(1, int(round(np.sqrt(g))))
+    gc = -(-g // block)
+    coarse = (fx // block) * gc + fy // block
+    coarse_occupied, cell_coarse = np.unique(coarse, return_inverse=True)
+    coarse_mass = np.bincount(cell_coarse, weights=mass)
+    coarse_centre = np.stack([np.bincount(cell_coarse, weights=centre[:, 0] * mass),
+                              np.bincount(cell_coarse, weights=centre[:, 1] * mass)], 1) / coarse_mass[:, None]
+    cx, cy = np.divmod(coarse_occupied, gc)
+
+    # Far field, once per fine cell: coarse blocks beyond the neighbouring blocks...
+    far = ((np.abs(cx[cell_coarse][:, None] - cx[None, :]) > 1)
+           | (np.abs(cy[cell_coarse][:, None] - cy[None, :]) > 1))
+    ddx = centre[:, 0, None] - coarse_centre[None, :, 0]
+    ddy = centre[:, 1, None] - coarse_centre[None, :, 1]
+    w = far * (coarse_mass * k2) / np.maximum(ddx * ddx + ddy * ddy, MIN_DISTANCE2)
+    cell_force = np.stack([(ddx * w).sum(1), (ddy * w).sum(1)], 1)
+    # ...and fine cells inside the neighbouring blocks that are not adjacent to the cell
+    i, j = _pairs(coarse, fx // block, fy // block, gc)
+    keep = (np.abs(fx[i] - fx[j]) > 1) | (np.abs(fy[i] - fy[j]) > 1)
+    i, j = i[keep], j[keep]
+    cell_force += _accumulate(m, i, j, centre[i], centre[j], mass[j], k2)
+    force = cell_force[node_cell]
+
+    # Near field: exact pairs of nodes in adjacent fine cells
+    i, j = _pairs(cell, cell_xy[:, 0], cell_xy[:, 1], g)
+    keep = i != j
+    i, j = i[keep], j[keep]
+    return force + _accumulate(n, i, j, pos[i], pos[j], 1.0, k2)
+
+def force_layout(nodes, edges, iterations=LAYOUT_ITERATIONS, spring_length=SPRING_LENGTH, seed=0):
+    """{node id: (x, y)} for every node; edges to ids that are not nodes are ignored."""
+    n = len(nodes)
+    if n == 0:
+        return {}
+    index = {node.get("id"): i for i, node in enumerate(nodes)}
+    pairs = np.array([(index[e.get("from")], index[e.get("to")]) for e in edges
+                      if e.get("from") in index and e.get("to") in index and e.get("from") != e.get("to")],
+                     dtype=np.int64).reshape(-1, 2)
+
+    k = spring_length
+    radius = k * np.sqrt(n) / 2
+    rng = np.random.default_rng(seed)
+    pos = rng.uniform(-radius, radius, size=(n, 2))
+    fixed = np.zeros(n, dtype=bool)
+    for i, node in enumerate(nodes):
+        if node.get("fixed") and node.get("x") is not None and node.get("y") is not None:
+            pos[i] = (node["x"], node["y"])
+            fixed[i] = True
+
+    repulsion = _repulsion_exact if n <= LAYOUT_EXACT_LIMIT else _repulsion_grid
+    temperature = radius / 4
+    for step in range(iterations):
+        force = repulsion(pos, k * k)
+        if len(pairs):
+            d = pos[pairs[:, 1]] - pos[pairs[:, 0]]
+            pull = d * (np.sqrt((d ** 2).sum(1)) / k)[:, None]
+            for axis in (0, 1):
+                force[:, axis] += np.bincount(pairs[:, 0], weights=pull[:, axis], minlength=n)
+                force[:, axis] -= np.bincount(pairs[:, 1], weights=pull[:, axis], minlength=n)
+        force -= GRAVITY * pos
+        length = np.maximum(np.sqrt((force ** 2).sum(1)), 1e-9)
+        step_size = temperature * (1 - step / iterations)
+        move = force * (np.minimum(length, step_size) / length)[:, None]
+        move[fixed] = 0
+        pos += move
+    return {node.get("id"): (float(pos[i, 0]), float(pos[i, 1])) for i, node in enumerate(nodes)}
+
+class LayoutCache:
+    """LRU of layouts by graph_key(); concurrent requests for one graph share a computation."""
+
+    def __init__(self, max_entries=256):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._locks = {}
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "misses": 0}
+
+    def get(self, nodes, edges):
+        key = graph_key(nodes, edges)
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.stats["hits"] += 1
+                return key, self._entries[key]
+            key_lock = self._locks.setdefault(key, threading.Lock())
+        with key_lock:
+            with self._lock:
+                if key in self._entries:
+                    self.stats["hits"] += 1
+                    return key, self._entries[key]
+            # Seeded from the key, so a layout recomputed after eviction comes out the same
+            positions = force_layout(nodes, edges, seed=int(key[:8], 16))
+            with self._lock:
+                self.stats["misses"] += 1
+                self._entries[key] = positions
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+                self._locks.pop(key, None)
+        return key, positions
+
+    def __len__(self):
+        return len(self._entries)
+
+def apply_layout(graph, cache):
+    """Sets x/y on every node of a {"nodes", "edges"} graph and records the layout key."""
+    key, positions = cache.get(graph["nodes"], graph["edges"])
+    for node in graph["nodes"]:
+        if not node.get("fixed"):
+            node["x"], node["y"] = (round(v) for v in positions[node.get("id")])
+    graph["layout"] = key
+    return graph
@@ -0,0 +1,127 @@
+"""Compact columnar encoding of vis-network graphs ({"nodes": [...], "edges": [...]}).
+
+Layout of an encoded graph:
+
+    {"format": "columnar-v2",
+     "strings": [...],                  # every distinct string, once
+     "ids": [s, ...],                   # node ids as string indexes; nodes first,
+                                        # then edge endpoints that are not nodes
+     "node_count": N,
+     "nodes": {key: column, ...},       # one column per node key except "id"
+     "edge_count": M,
+     "edges": {"from": [i, ...], "to": [i, ...], key: column, ...}}
+
+`from`/`to` are indexes into "ids". A column is one of
+    {"const": v}         every row has value v
+    {"str": [s|null]}    string-table indexes, null for a None value
+    {"num": [n|null]}    numbers
+    {"json": [v|null]}   anything else (e.g. vis "fixed": {"x": true})
+and the non-const ones carry "missing": [row, ...] when some rows lack the
+key, so a missing key and a None value stay apart.
+Other top-level keys of the graph are passed through unchanged.
+decode() restores exactly the original lists.
+"""
+FORMAT = "columnar-v2"
+_MISSING = object()
+
+class _Strings:
+    def __init__(self):
+        self.index = {}
+        self.table = []
+
+    def __call__(self, s):
+        i = self.index.get(s)
+        if i is None:
+            i = self.index[s] = len(self.table)
+            self.table.append(s)
+        return i
+
+def _column(values, strings):
+    missing = [i for i, v in enumerate(values) if v is _MISSING]
+    present = [v for v in values if v is not _MISSING]
+    first = present[0] if present else None
+    if not missing and all(type(v) is type(first) and v == first for v in present):
+        return {"const": first}
+    values = [None if v is _MISSING else v for v in values]
+    if all(v is None or isinstance(v, str) for v in present):
+        column = {"str": [None if v is None else strings(v) for v in values]}
+    elif all(v is None or isinstance(v, (int, float)) and not isinstance(v, bool) for v in present):
+        column = {"num": values}
+    else:
+        column = {"json": values}
+    if missing:
+        column["missing"] = missing
+    return column
+
+def _columns(rows, skip, strings):
+    keys = []
+    for row in rows:
+        for k in row:
+            if k not in skip and k not in keys:
+                keys.append(k)
+    return {k: _column([row.get(k, _MISSING) for row in rows], strings) for k in keys}
+
+def encode(graph):
+    strings = _Strings()
+    nodes = graph.get("nodes", [])
+    edges = graph.get("edges", [])
+
+    ids = []
+    position = {}
+    def intern_id(node_id):
+        i = position.get(node_id)
+        if i is None:
+            i = position[node_id] = len(ids)
+            ids.append(strings(str(node_id)))
+        return i
+
+    for node in nodes:
+        intern_id(node.get("id"))
+    edge_columns = {"from": [intern_id(e.get("from")) for e in edges],
+                    "to": [intern_id(e.get("to")) for e in edges]}
+    edge_columns.update(_columns(edges, ("from", "to"), strings))
+    node_columns = _columns(nodes, ("id",), strings)
+
+    out = {k: v for k, v in graph.items() if k not in ("nodes", "edges")}
+    out.update({
+        "format": FORMAT,
+        "strings": strings.table,
+        "ids": ids,
+        "node_count": len(nodes),
+        "nodes": node_columns,
+        "edge_count": len(edges),
+        "edges": edge_columns,
+    })
+    return out
+
+def _read(column, i, strings):
+    if "const" in column:
+        return column["const"]
+    if "str" in column:
+        s = column["str"][i]
+        return None if s is None else strings[s]
+    return column.get("num", column.get("json"))[i]
+
+def _rows(count, columns, first, strings):
+    columns = {key: (column, set(column.get("missing", ()))) for key, column in columns.items()
+               if key not in ("from", "to")}
+    rows = []
+    for i in range(count):
+        row = first(i)
+        for key, (column, missing) in columns.items():
+            if i not in missing:
+                row[key] = _read(column, i, strings)
+        rows.append(row)
+    return rows
+
+def decode(data):
+    """Inverse of encode(); mirrors decodeCompactGraph() in index.html."""
+    strings = data["strings"]
+    ids = [strings[s] for s in data["ids"]]
+    nodes = _rows(data["node_count"], data["nodes"], lambda i: {"id": ids[i]}, strings)
+    edges = _rows(data["edge_count"], data["edges"],
+                  lambda i: {"from": ids[data["edges"]["from"][i]], "to": ids[data["edges"]["to"][i]]}, strings)
+    out = {k: v for k, v in data.items()
+           if k not in ("format", "strings", "ids", "node_count", "nodes", "edge_count", "edges")}
+    out.update({"nodes": nodes, "edges": edges})
+    return out
@@ -0,0 +1,107 @@
+import queue
+import sqlite3
+import threading
+import time
+from db import QUERIES
+from ranking import fold_interest
+
+HISTORY_SCHEMA = [
+    "CREATE INDEX IF NOT EXISTS idx_user_history_user_ts ON user_history (username, timestamp)",
+    # Searches older than the retention window, one row per user, query and day
+    '''CREATE TABLE IF NOT EXISTS user_history_daily
+       (username TEXT NOT NULL,
+        query TEXT NOT NULL,
+        day TEXT NOT NULL,
+        count INTEGER NOT NULL,
+        PRIMARY KEY (username, query, day)) WITHOUT ROWID''',
+]
+
+class HistoryWriter:
+    """Write-behind queue for search history and interest profile updates.
+
+    Requests call add() and return immediately; a background thread writes
+    everything queued in the last `flush_interval` seconds in one transaction
+    (one fsync per batch instead of one per search). Every `compact_every`
+    seconds, rows older than `retention_days` are rolled up into
+    user_history_daily and removed from user_history.
+    """
+
+    def __init__(self, db, flush_interval=0.25, max_batch=500, retention_days=90, compact_every=3600):
+        self.db = db
+        self.flush_interval = flush_interval
+        self.max_batch = max_batch
+        self.retention_days = retention_days
+        self.compact_every = compact_every
+        self._queue = queue.Queue()
+        self._idle = threading.Condition()
+        self._pending = 0
+        self.stats = {"written": 0, "batches": 0, "compacted": 0, "errors": 0}
+        with db.connection() as conn:
+            for statement in HISTORY_SCHEMA:
+                conn.execute(statement)
+        self._thread = threading.Thread(target=self._run, name='history-writer', daemon=True)
+        self._thread.start()
+
+    def add(self, username, query, now=None):
+        with self._idle:
+            self._pending += 1
+        self._queue.put((username, query, now or time.time()))
+
+    def flush(self, timeout=5):
+        """Blocks until everything added so far is written (or the timeout passes)."""
+        with self._idle:
+            return self._idle.wait_for(lambda: self._pending == 0, timeout)
+
+    def _run(self):
+        next_compact = time.monotonic() + 60
+        while True:
+            try:
+                batch = [self._queue.get(timeout=self.flush_interval)]
+            except queue.Empty:
+                batch = []
+            if batch:
+                # Let the rest of the burst arrive, then take it all in one go
+                time.sleep(self.flush_interval)
+                while len(batch) < self.max_batch:
+                    try:
+                        batch.append(self._queue.get_nowait())
+                    except queue.Empty:
+                        break
+                self._write(batch)
+            if time.monotonic() >= next_compact:
+                self.compact()
+                next_compact = time.monotonic() + self.compact_every
+
+    def _write(self, batch):
+        try:
+            with self.db.connection() as conn:
+                conn.executemany(QUERIES["insert_history"],
+                                 [(u, q, time.strftime('%Y-%m-%d %H:%M:%S', time.gmtime(ts))) for u, q, ts in batch])
+                for username, query, ts in batch:
+                    rows = conn.execute(QUERIES["user_interest"], (username,)).fetchall()
+                    changed, dropped = fold_interest(rows, query, ts)
+                    conn.executemany(QUERIES["delete_interest"], [(username, t) for t in dropped])
+                    conn.executemany(QUERIES["upsert_interest"], [(username,) + tuple(row) for row in changed])
+            self.stats["written"] += len(batch)
+            self.stats["batches"] += 1
+        except sqlite3.Error as e:
+            self.stats["errors"] += 1
+            print(f"History write error ({len(batch)} searches dropped): {e}")
+        finally:
+            with self._idle:
+                self._pending -= len(batch)
+                self._idle.notify_all()
+
+    def compact(self):
+        """Rolls history past the retention window into daily per-query counts. Returns rows removed."""
+        cutoff = time.strftime('%Y-%m-%d %H:%M:%S', time.gmtime(time.time() - self.retention_days * 86400))
+        try:
+            with self.db.connection() as conn:
+                conn.execute(QUERIES["rollup_history"], (cutoff,))
+                removed = conn.execute(QUERIES["delete_history_before"], (cutoff,)).rowcount
+            self.stats["compacted"] += removed
+            return removed
+        except sqlite3.Error as e:
+            self.stats["errors"] += 1
+            print(f"History compaction error: {e}")
+            return 0
@@ -0,0 +1,113 @@
+import random
+import threading
+import time
+import urllib.parse
+from contextlib import contextmanager
+import requests
+from requests.adapters import HTTPAdapter
+
+# Per-upstream defaults: request timeout (seconds), how many requests may be in
+# flight to the host at once, and how many times a failed request is retried.
+UPSTREAMS = {
+    "api.openalex.org": {"timeout": 8, "max_concurrency": 10, "retries": 2},
+    "uz.wikipedia.org": {"timeout": 3, "max_concurrency": 6, "retries": 1},
+    "en.wikipedia.org": {"timeout": 3, "max_concurrency": 6, "retries": 1},
+    "cyberleninka.ru": {"timeout": 5, "max_concurrency": 4, "retries": 0},
+    "www.googleapis.com": {"timeout": 5, "max_concurrency": 4, "retries": 1},
+    "www.wikidata.org": {"timeout": 3, "max_concurrency": 4, "retries": 1},
+    # The public SPARQL endpoint throttles aggressively, keep it gentle
+    "query.wikidata.org": {"timeout": 4, "max_concurrency": 2, "retries": 1},
+}
+DEFAULT_UPSTREAM = {"timeout": 5, "max_concurrency": 4, "retries": 1}
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+BACKOFF_BASE = 0.2
+BACKOFF_CAP = 2.0
+
+# One keep-alive session for the whole app; urllib3 keeps a connection pool per host
+SESSION = requests.Session()
+_adapter = HTTPAdapter(pool_connections=len(UPSTREAMS) + 4,
+                       pool_maxsize=max(u["max_concurrency"] for u in UPSTREAMS.values()))
+SESSION.mount("https://", _adapter)
+SESSION.mount("http://", _adapter)
+SESSION.headers.update({'User-Agent': 'LibUZ/1.0 (https://libuz.vercel.app)'})
+
+_host_limits = {}
+_host_limits_lock = threading.Lock()
+_local = threading.local()
+
+def upstream_config(host):
+    return UPSTREAMS.get(host, DEFAULT_UPSTREAM)
+
+def _host_semaphore(host):
+    with _host_limits_lock:
+        semaphore = _host_limits.get(host)
+        if semaphore is None:
+            semaphore = threading.BoundedSemaphore(upstream_config(host)["max_concurrency"])
+            _host_limits[host] = semaphore
+        return semaphore
+
+def backoff_delay(attempt, retry_after=None):
+    """Full-jitter exponential backoff, honouring a numeric Retry-After header when given."""
+    if retry_after and retry_after.isdigit():
+        return min(BACKOFF_CAP, float(retry_after))
+    return random.uniform(0, min(BACKOFF_CAP, BACKOFF_BASE * (2 ** attempt)))
+
+@contextmanager
+def deadline(at):
+    """Every get() in the block (on this thread) finishes by time.monotonic() `at`.
+
+    Nested deadlines keep the earlier one. Used by the search fan-out so an
+    upstream's timeout and retries fit inside the request's budget.
+    """
+    previous = getattr(_local, "deadline", None)
+    _local.deadline = at if previous is None else min(at, previous)
+    try:
+        yield
+    finally:
+        _local.deadline = previous
+
+def _time_left(timeout, deadline_at):
+    return timeout if deadline_at is None else min(timeout, deadline_at - time.monotonic())
+
+def get(url, params=None, headers=None, timeout=None, retries=None, deadline_at=None):
+    """GET through the shared pool with the upstream's timeout, concurrency cap and retry policy.
+
+    With a deadline (deadline_at, else the enclosing deadline() block) each
+    attempt's timeout is cut to the time left, and no retry starts whose
+    backoff would run past it. Raises requests.RequestException like
+    requests.get does once retries are exhausted; retryable HTTP statuses are
+    returned as the final response.
+    """
+    host = urllib.parse.urlsplit(url).hostname or ""
+    config = upstream_config(host)
+    timeout = config["timeout"] if timeout is None else timeout
+    retries = config["retries"] if retries is None else retries
+    deadline_at = getattr(_local, "deadline", None) if deadline_at is None else deadline_at
+    semaphore = _host_semaphore(host)
+
+    for attempt in range(retries + 1):
+        if _time_left(timeout, deadline_at) <= 0:
+            raise requests.Timeout(f"{host}: request deadline passed")
+        if not semaphore.acquire(timeout=_time_left(timeout, deadline_at)):
+            raise requests.Timeout(f"{host}: concurrency limit reached")
+        try:
+            # Re-read after waiting for a slot
+            attempt_timeout = _time_left(timeout, deadline_at)
+            if attempt_timeout <= 0:
+                raise requests.Timeout(f"{host}: request deadline passed")
+            last = attempt == retries
+            try:
+                response = SESSION.get(url, params=params, headers=headers, timeout=attempt_timeout)
+                if response.status_code not in RETRY_STATUSES:
+                    return response
+                delay = backoff_delay(attempt, response.headers.get('Retry-After'))
+                if last or _time_left(delay, deadline_at) < delay:
+                    return response
+            except (requests.ConnectionError, requests.Timeout):
+                delay = backoff_delay(attempt)
+                if last or _time_left(delay, deadline_at) < delay:
+                    raise
+        finally:
+            semaphore.release()
+        time.sleep(delay)
@@ -0,0 +1,98 @@
+import queue
+import smtplib
+import threading
+import time
+
+class MailQueue:
+    """Sends email from a background thread over one reused, authenticated SMTP connection.
+
+    send() only enqueues. The worker connects on the first message, keeps
+    the connection for bursts, and closes it after `idle_timeout` seconds
+    without mail. A dropped connection is reopened and the message retried
+    up to `retries` times. With use_ssl=False it talks plain SMTP, e.g. to a
+    local stand-in server in tests.
+    """
+
+    def __init__(self, host, port, username=None, password=None, use_ssl=True,
+                 idle_timeout=60, retries=2, timeout=30):
+        self.host = host
+        self.port = port
+        self.username = username
+        self.password = password
+        self.use_ssl = use_ssl
+        self.idle_timeout = idle_timeout
+        self.retries = retries
+        self.timeout = timeout
+        self._queue = queue.Queue()
+        self._server = None
+        self.stats = {"sent": 0, "failed": 0, "connects": 0}
+        self._thread = threading.Thread(target=self._run, name='mailer', daemon=True)
+        self._thread.start()
+
+    def send(self, msg):
+        self._queue.put(msg)
+
+    def depth(self):
+        """Messages waiting to be sent."""
+        return self._queue.qsize()
+
+    def flush(self, timeout=None):
+        """Blocks until every queued message has been handled (sent or given up on)."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._queue.all_tasks_done:
+            while self._queue.unfinished_tasks:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._queue.all_tasks_done.wait(remaining)
+        return True
+
+    def _connect(self):
+        cls = smtplib.SMTP_SSL if self.use_ssl else smtplib.SMTP
+        server = cls(self.host, self.port, timeout=self.timeout)
+        if self.username:
+            server.login(self.username, self.password)
+        self.stats["connects"] += 1
+        return server
+
+    def _disconnect(self):
+        if self._server is not None:
+            try:
+                self._server.quit()
+            except Exception:
+                pass
+            self._server = None
+
+    def _deliver(self, msg):
+        for attempt in range(self.retries + 1):
+            try:
+                if self._server is None:
+                    self._server = self._connect()
+                self._server.send_message(msg)
+                return True
+            except (smtplib.SMTPServerDisconnected, smtplib.SMTPConnectError, OSError) as e:
+                # Stale or broken connection: reconnect and try again
+                print(f"❌ SMTP ulanish xatosi (urinish {attempt + 1}): {e}")
+                self._disconnect()
+            except smtplib.SMTPException as e:
+                # Rejected message (bad recipient, auth, ...): retrying will not help
+                print(f"❌ Email yuborishda xatolik: {e}")
+                self._disconnect()
+                return False
+        return False
+
+    def _run(self):
+        while True:
+            try:
+                msg = self._queue.get(timeout=self.idle_timeout)
+            except queue.Empty:
+                self._disconnect()
+                continue
+            try:
+                if self._deliver(msg):
+                    self.stats["sent"] += 1
+                    print(f"✅ Email jo'natildi: {msg['To']}")
+                else:
+                    self.stats["failed"] += 1
+            finally:
+                self._queue.task_done()
@@ -0,0 +1,195 @@
+"""Local OpenAlex works index (SQLite FTS5) built from snapshot files.
+
+Usage:
+    python openalex_index.py ingest works/part_000.gz [works/part_001.gz ...] [--db openalex_index.db]
+
+Snapshot files are gzipped JSON Lines (one work per line) and are streamed
+line by line, so files of any size can be ingested. Only the fields the app
+uses are kept: id, title, authors, concepts, year, citation count, OA URL
+and referenced works. Re-ingesting a work replaces the stored copy.
+"""
+import gzip
+import json
+import os
+import re
+import sqlite3
+import sys
+import threading
+
+SCHEMA = [
+    '''CREATE TABLE IF NOT EXISTS works
+       (id TEXT UNIQUE NOT NULL,
+        title TEXT,
+        authors TEXT,
+        concepts TEXT,
+        publication_year INTEGER,
+        cited_by_count INTEGER DEFAULT 0,
+        oa_url TEXT,
+        referenced_works TEXT)''',
+    "CREATE INDEX IF NOT EXISTS idx_works_year ON works (publication_year)",
+    # rowid of works_fts is the rowid of works
+    '''CREATE VIRTUAL TABLE IF NOT EXISTS works_fts USING fts5
+       (title, authors, concepts, tokenize = "unicode61 remove_diacritics 2")''',
+]
+
+def _open(path):
+    return gzip.open(path, 'rt', encoding='utf-8') if path.endswith('.gz') else open(path, 'r', encoding='utf-8')
+
+def compact_work(work):
+    """The subset of an OpenAlex work object that is stored in the index."""
+    oa = work.get("open_access") or {}
+    return {
+        "id": work.get("id"),
+        "title": work.get("title") or work.get("display_name"),
+        "authors": [{"id": (a.get("author") or {}).get("id"),
+                     "display_name": (a.get("author") or {}).get("display_name")}
+                    for a in work.get("authorships", [])],
+        "concepts": [c.get("display_name", "") for c in work.get("concepts", [])[:5]],
+        "publication_year": work.get("publication_year"),
+        "cited_by_count": work.get("cited_by_count") or 0,
+        "oa_url": oa.get("oa_url") if oa.get("is_oa") else None,
+        "referenced_works": work.get("referenced_works", []),
+    }
+
+def fts_match_query(terms):
+    """FTS5 MATCH expression: a work matches if it contains every word of any term.
+
+    Words are prefix-matched, so Uzbek suffixes still match
+    ("adabiyot" finds "adabiyoti", "adabiyotlar").
+    """
+    clauses = []
+    for term in terms:
+        words = [w for w in re.findall(r'\w+', term or '') if len(w) > 1]
+        if words:
+            clauses.append("(" + " AND ".join(f'"{w}"*' for w in words) + ")")
+    return " OR ".join(clauses)
+
+class OpenAlexIndex:
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+        conn = self._conn()
+        for statement in SCHEMA:
+            conn.execute(statement)
+        conn.commit()
+
+    def _conn(self):
+        # One connection per thread; readers do not block each other
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path)
+            conn.row_factory = sqlite3.Row
+            self._local.conn = conn
+        return conn
+
+    def ingest_file(self, path, batch_size=2000):
+        count = 0
+        batch = []
+        with _open(path) as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    work = compact_work(json.loads(line))
+                except ValueError:
+                    continue
+                if not work["id"] or not work["title"]:
+                    continue
+                batch.append(work)
+                if len(batch) >= batch_size:
+                    count += self._write(batch)
+                    batch = []
+        if batch:
+            count += self._write(batch)
+        return count
+
+    def _write(self, works):
+        conn = self._conn()
+        with conn:
+            for w in works:
+                old = conn.execute("SELECT rowid FROM works WHERE id = ?", (w["id"],)).fetchone()
+                if old:
+                    conn.execute("DELETE FROM works_fts WHERE rowid = ?", (old[0],))
+                    conn.execute("DELETE FROM works WHERE rowid = ?", (old[0],))
+                cur = conn.execute(
+                    "INSERT INTO works (id, title, authors, concepts, publication_year, cited_by_count, oa_url, referenced_works) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    (w["id"], w["title"], json.dumps(w["authors"], ensure_ascii=False),
+                     json.dumps(w["concepts"], ensure_ascii=False), w["publication_year"],
+                     w["cited_by_count"], w["oa_url"], json.dumps(w["referenced_works"])))
+                conn.execute("INSERT INTO works_fts (rowid, title, authors, concepts) VALUES (?, ?, ?, ?)",
+                             (cur.lastrowid, w["title"],
+                              " ".join(a["display_name"] or "" for a in w["authors"]),
+                              " ".join(w["concepts"])))
+        return len(works)
+
+    def search(self, terms, year_start=None, year_end=None, min_citations=None, max_citations=None, limit=40):
+        """Works matching any of the terms, best BM25 first, in OpenAlex /works result shape."""
+        match = fts_match_query(terms)
+        if not match:
+            return []
+        sql = ("SELECT w.*, works_fts.rank AS fts_rank FROM works_fts JOIN works w ON w.rowid = works_fts.rowid "
+               "WHERE works_fts MATCH ?")
+        args = [match]
+        if year_start:
+            sql += " AND w.publication_year >= ?"
+            args.append(int(year_start))
+        if year_end:
+            sql += " AND w.publication_year <= ?"
+            args.append(int(year_end))
+        # Same semantics as the OpenAlex filter: "min-max" is inclusive, a single bound is strict
+        if min_citations and max_citations:
+            sql += " AND w.cited_by_count BETWEEN ? AND ?"
+            args.extend([int(min_citations), int(max_citations)])
+        elif min_citations:
+            sql += " AND w.cited_by_count > ?"
+            args.append(int(min_citations))
+        elif max_citations:
+            sql += " AND w.cited_by_count < ?"
+            args.append(int(max_citations))
+        sql += " ORDER BY works_fts.rank LIMIT ?"
+        args.append(limit)
+        try:
+            rows = self._conn().execute(sql, args).fetchall()
+        except sqlite3.OperationalError as e:
+            print(f"Local index search error: {e}")
+            return []
+        return [self._to_work(row, relevance=-row["fts_rank"]) for row in rows]
+
+    def _to_work(self, row, relevance=None):
+        return {
+            "id": row["id"],
+            "title": row["title"],
+            "publication_year": row["publication_year"],
+            "cited_by_count": row["cited_by_count"],
+            "relevance_score": relevance,
+            "authorships": [{"author": a} for a in json.loads(row["authors"] or "[]")],
+            "concepts": [{"display_name": c} for c in json.loads(row["concepts"] or "[]")],
+            "open_access": {"is_oa": bool(row["oa_url"]), "oa_url": row["oa_url"]},
+            "referenced_works": json.loads(row["referenced_works"] or "[]"),
+        }
+
+def main(argv):
+    if len(argv) < 2 or argv[0] != 'ingest':
+        print(__doc__)
+        return 1
+    db_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "openalex_index.db")
+    files = []
+    args = iter(argv[1:])
+    for arg in args:
+        if arg == '--db':
+            db_path = next(args)
+        else:
+            files.append(arg)
+    index = OpenAlexIndex(db_path)
+    total = 0
+    for path in files:
+        n = index.ingest_file(path)
+        total += n
+        print(f"{path}: {n} works")
+    print(f"Jami: {total} works -> {db_path}")
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,105 @@
+"""One-time login codes, keyed by email.
+
+Both stores have the same interface: put(email, otp, expires), get(email)
+-> {"otp", "expires"} or None, delete(email) and sweep(). get() may still
+return an expired code that has not been swept yet, so callers can tell
+"expired" from "never requested". A daemon thread calls sweep() every
+`sweep_interval` seconds; a sweep only touches expired codes.
+"""
+import heapq
+import threading
+import time
+
+OTP_SCHEMA = [
+    '''CREATE TABLE IF NOT EXISTS otp_codes
+       (email TEXT PRIMARY KEY,
+        otp TEXT NOT NULL,
+        expires REAL NOT NULL)''',
+    "CREATE INDEX IF NOT EXISTS idx_otp_codes_expires ON otp_codes (expires)",
+]
+
+def _start_sweeper(store, interval):
+    def run():
+        while True:
+            time.sleep(interval)
+            try:
+                store.sweep()
+            except Exception as e:
+                print(f"OTP sweep error: {e}")
+    threading.Thread(target=run, name='otp-sweeper', daemon=True).start()
+
+class MemoryOTPStore:
+    """Codes in a dict, plus a min-heap of expiry times so a sweep pops only what has expired.
+
+    Per-process only: use SqliteOTPStore when several workers serve logins.
+    """
+
+    def __init__(self, sweep_interval=60):
+        self._codes = {}
+        self._expiry = []  # (expires, email); entries for replaced codes are skipped when popped
+        self._lock = threading.Lock()
+        _start_sweeper(self, sweep_interval)
+
+    def put(self, email, otp, expires):
+        with self._lock:
+            self._codes[email] = {"otp": otp, "expires": expires}
+            heapq.heappush(self._expiry, (expires, email))
+
+    def get(self, email):
+        with self._lock:
+            return self._codes.get(email)
+
+    def delete(self, email):
+        with self._lock:
+            self._codes.pop(email, None)
+
+    def sweep(self, now=None):
+        now = now or time.time()
+        removed = 0
+        with self._lock:
+            while self._expiry and self._expiry[0][0] < now:
+                expires, email = heapq.heappop(self._expiry)
+                entry = self._codes.get(email)
+                if entry is not None and entry["expires"] == expires:
+                    del self._codes[email]
+                    removed += 1
+        return removed
+
+    def __len__(self):
+        return len(self._codes)
+
+class SqliteOTPStore:
+    """Codes in an SQLite table shared by every process using the same database file.
+
+    Sweeps delete through the index on `expires`.
+    """
+
+    def __init__(self, db, sweep_interval=60):
+        self.db = db
+        with db.connection() as conn:
+            for statement in OTP_SCHEMA:
+                conn.execute(statement)
+        _start_sweeper(self, sweep_interval)
+
+    def put(self, email, otp, expires):
+        self.db.execute("otp_put", (email, otp, expires))
+
+    def get(self, email):
+        row = self.db.one("otp_get", (email,))
+        return {"otp": row["otp"], "expires": row["expires"]} if row else None
+
+    def delete(self, email):
+        self.db.execute("otp_delete", (email,))
+
+    def sweep(self, now=None):
+        return self.db.execute("otp_sweep", (now or time.time(),))
+
+    def __len__(self):
+        return self.db.one("otp_count")[0]
+
+def make_otp_store(kind, db, sweep_interval=60):
+    if kind == 'memory':
+        return MemoryOTPStore(sweep_interval)
+    if kind == 'sqlite':
+        return SqliteOTPStore(db, sweep_interval)
+    raise ValueError(f"Unknown OTP store: {kind!r} (expected 'sqlite' or 'memory')")
@@ -0,0 +1,285 @@
+import re
+import numpy as np
+from translit import transliterate
+
+_SPACES_RE = re.compile(r'\s+')
+_PUNCT_RE = re.compile(r'[^\w\s]')
+
+def normalize_text(text):
+    if type(text) is not str:
+        text = str(text)
+    # Lowercase and remove multiple spaces
+    text = text.lower().strip()
+    text = _SPACES_RE.sub(' ', text)
+    # Strip punctuation except alphanumeric and spaces
+    text = _PUNCT_RE.sub('', text)
+    return text
+
+def letter_normalize(text):
+    if type(text) is not str: text = str(text)
+    t = text.lower()
+    t = t.replace("x", "h").replace("х", "ҳ").replace("ҳ", "х")
+    t = t.replace("q", "k").replace("қ", "к")
+    t = t.replace("o'", "o").replace("o‘", "o").replace("o’", "o").replace("o`", "o").replace("ў", "о")
+    t = t.replace("g'", "g").replace("g‘", "g").replace("g’", "g").replace("g`", "g").replace("ғ", "г")
+    return t
+
+def is_exact_word(query, text):
+    if not query or not text: return False
+    return bool(re.search(r'\b' + re.escape(query) + r'\b', text))
+
+SYNONYMS = {
+    "kitob": "book", "book": "kitob",
+    "dasturlash": "programming", "programming": "dasturlash",
+    "suniy intellekt": "ai", "ai": "suniy intellekt", "artificial intelligence": "suniy intellekt",
+    "o'qituvchi": "teacher", "teacher": "o'qituvchi",
+    "iqtisodiyot": "economics", "economics": "iqtisodiyot",
+    "tibbiyot": "medicine", "medicine": "tibbiyot",
+    "falsafa": "philosophy", "philosophy": "falsafa",
+    "san'at": "art", "art": "san'at",
+    "talim": "education", "education": "talim",
+    "huquq": "law", "law": "huquq",
+    "texnologiya": "technology", "technology": "texnologiya"
+}
+
+# Field weights used by the NLP match score
+TITLE_WEIGHT = 3
+DESCRIPTION_WEIGHT = 2
+TAG_WEIGHT = 1
+
+# User interest profiles: each term of a user's queries gets +1 per search,
+# decaying with this half-life; ranking reads the strongest terms as a vector.
+INTEREST_HALF_LIFE = 14 * 24 * 3600
+INTEREST_MIN_WEIGHT = 0.05
+INTEREST_VECTOR_SIZE = 50
+
+def interest_terms(query):
+    return {w for w in normalize_text(query).split() if len(w) > 2}
+
+def decay_weight(weight, updated_at, now):
+    return weight * 0.5 ** ((now - updated_at) / INTEREST_HALF_LIFE)
+
+def fold_interest(rows, query, now):
+    """Adds one search to a profile given as (term, weight, updated_at) rows.
+
+    Returns (changed_rows, dropped_terms): the query's terms with their new
+    weight, and terms that decayed below INTEREST_MIN_WEIGHT.
+    """
+    current = {term: decay_weight(weight, updated_at, now) for term, weight, updated_at in rows}
+    changed = [(term, current.get(term, 0.0) + 1.0, now) for term in interest_terms(query)]
+    dropped = [term for term, weight in current.items() if weight < INTEREST_MIN_WEIGHT]
+    return changed, dropped
+
+def interest_vector(rows, now):
+    """The INTEREST_VECTOR_SIZE strongest terms of a profile as {term: decayed weight}."""
+    weights = [(decay_weight(weight, updated_at, now), term) for term, weight, updated_at in rows]
+    top = sorted((w for w in weights if w[0] >= INTEREST_MIN_WEIGHT), reverse=True)[:INTEREST_VECTOR_SIZE]
+    return {term: weight for weight, term in top}
+
+def _word_pattern(word):
+    return re.compile(r'\b' + re.escape(word) + r'\b') if word else None
+
+class QueryContext:
+    """Every normalized form of the query, computed once per ranking call."""
+
+    def __init__(self, query):
+        self.q_norm = normalize_text(query)
+        self.q_translit = normalize_text(transliterate(query))
+        self.q_letter_norm = letter_normalize(self.q_translit)
+        self.q_words = set(self.q_norm.split())
+        self.q_synonyms = set()
+        for w in self.q_words:
+            if w in SYNONYMS:
+                self.q_synonyms.add(SYNONYMS[w])
+
+        self.norm_re = _word_pattern(self.q_norm)
+        self.translit_re = _word_pattern(self.q_translit) if self.q_translit != self.q_norm else None
+        self.letter_re = _word_pattern(self.q_letter_norm) if self.q_letter_norm != self.q_translit else None
+        self.synonym_res = [(syn, _word_pattern(syn)) for syn in self.q_synonyms]
+        self.partial_words = [(w, letter_normalize(w)) for w in self.q_words if len(w) > 3]
+
+    def terms(self):
+        """Query tokens in both scripts, used for BM25."""
+        return set(self.q_norm.split()) | set(self.q_translit.split())
+
+class FieldIndex:
+    """Tokenizes each distinct field text once and memoizes its match against the query.
+
+    The same tags ("Computer science", "Medicine", ...) repeat across most
+    results, so a batch has far fewer distinct texts than fields.
+    """
+
+    def __init__(self, ctx):
+        self.ctx = ctx
+        self.forms = {}
+        self.matches = {}
+
+    def form(self, text):
+        f = self.forms.get(text)
+        if f is None:
+            text_norm = normalize_text(text)
+            text_lat = normalize_text(transliterate(text))
+            f = (text_norm, text_lat, letter_normalize(text_lat))
+            self.forms[text] = f
+        return f
+
+    def match(self, text):
+        """Returns (points, reason) for one field before its weight is applied."""
+        m = self.matches.get(text)
+        if m is not None:
+            return m
+        ctx = self.ctx
+        text_norm, text_lat, text_let_norm = self.form(text)
+        m = (0, None)
+        # Exact script word match
+        if text_norm and ctx.norm_re and ctx.norm_re.search(text_norm):
+            m = (5, "Exact match (+5)")
+        # Translit word match
+        elif text_lat and ctx.translit_re and ctx.translit_re.search(text_lat):
+            m = (4, "Translit match (+4)")
+        # Phonetic/Normalized word match
+        elif text_let_norm and ctx.letter_re and ctx.letter_re.search(text_let_norm):
+            m = (4, "Normalized match (+4)")
+        else:
+            # Synonyms
+            for syn, syn_re in ctx.synonym_res:
+                if (text_norm and syn_re.search(text_norm)) or (text_lat and syn_re.search(text_lat)):
+                    m = (3, f"Synonym '{syn}' (+3)")
+                    break
+            # Partial
+            else:
+                for w, w_let in ctx.partial_words:
+                    if w in text_norm or w in text_lat or w_let in text_let_norm:
+                        m = (2, f"Partial '{w}' (+2)")
+                        break
+        self.matches[text] = m
+        return m
+
+    def tokens(self, text):
+        text_norm, text_lat, _ = self.form(text)
+        return text_norm.split() + (text_lat.split() if text_lat != text_norm else [])
+
+def bm25_scores(doc_tokens, query_terms, k1=1.5, b=0.75):
+    """Okapi BM25 of every document against the query, with the batch itself as the corpus."""
+    terms = sorted(query_terms)
+    if not doc_tokens or not terms:
+        return np.zeros(len(doc_tokens))
+    term_index = {t: j for j, t in enumerate(terms)}
+    tf = np.zeros((len(doc_tokens), len(terms)))
+    for i, tokens in enumerate(doc_tokens):
+        for tok in tokens:
+            j = term_index.get(tok)
+            if j is not None:
+                tf[i, j] += 1
+    doc_len = np.array([len(t) for t in doc_tokens], dtype=float)
+    avg_len = doc_len.mean() or 1.0
+    df = (tf > 0).sum(axis=0)
+    idf = np.log(1.0 + (len(doc_tokens) - df + 0.5) / (df + 0.5))
+    norm = k1 * (1.0 - b + b * doc_len / avg_len)
+    return (idf * tf * (k1 + 1.0) / (tf + norm[:, None])).sum(axis=1)
+
+def batch_scale(results, scale=None):
+    """(max_cites, max_rel) used to normalize popularity and API relevance, at least `scale`."""
+    max_cites = max([int(r.get('cited_by_count') or 0) for r in results] + [1])
+    max_rel = max([float(r.get('relevance_score') or 0) for r in results] + [1.0])
+    if scale:
+        max_cites, max_rel = max(max_cites, scale[0]), max(max_rel, scale[1])
+    return max_cites, max_rel
+
+def rank_results(results, query, user_interest=None, bm25=False, scale=None):
+    """Hybrid Recommendation Ranking: splits results into exact / related / recommended buckets.
+
+    Field matching runs once per distinct text; popularity, recency, user
+    interest and the final blend are computed for the whole batch as arrays.
+    `user_interest` is the user's {term: weight} vector from interest_vector().
+    With bm25=True every result also gets a `bm25_score` (not blended in).
+    Later pages of one search pass the first page's `scale` so their scores
+    stay comparable.
+    """
+    ctx = QueryContext(query)
+    index = FieldIndex(ctx)
+    n = len(results)
+
+    nlp = np.zeros(n)
+    t_norms = []
+    for i, r in enumerate(results):
+        t_orig = r.get("original_title", "")
+        d_orig = r.get("description", "")
+        t_norms.append(index.form(t_orig)[0])
+
+        reasons = []
+        fields = [(t_orig, "Title", TITLE_WEIGHT), (d_orig, "Description", DESCRIPTION_WEIGHT)]
+        fields += [(tag, "Tags", TAG_WEIGHT) for tag in r.get("tags", [])]
+        for text, weight_name, multiplier in fields:
+            if not text: continue
+            points, reason = index.match(text)
+            if points:
+                nlp[i] += points * multiplier
+                reason = f"{reason} in {weight_name}"
+                # Filter repeated reasons
+                if reason not in reasons: reasons.append(reason)
+
+        r["match_reason"] = " | ".join(reasons) if reasons else "Semantic vector API fallback"
+        r["nlp_score"] = int(nlp[i])
+
+    if bm25:
+        doc_tokens = [index.tokens(r.get("original_title", "")) + index.tokens(r.get("description", ""))
+                      + [tok for tag in r.get("tags", []) for tok in index.tokens(tag)] for r in results]
+        for r, s in zip(results, bm25_scores(doc_tokens, ctx.terms())):
+            r["bm25_score"] = float(f"{s:.3f}")
+
+    cites = np.array([float(r.get("cited_by_count", 0) or 0) for r in results])
+    rel = np.array([float(r.get("relevance_score") or 0) for r in results])
+    years = np.array([int(y) if str(y).isdigit() else 2000 for y in (r.get("publication_year") for r in results)], dtype=float)
+    max_cites, max_rel = batch_scale(results, scale)
+
+    # Blend into hybrid API score
+    api_rel = rel / max_rel
+    norm_nlp = np.minimum(1.0, nlp / 15.0)
+    final_rel = np.maximum(api_rel, norm_nlp)
+    pop = cites / max_cites
+    rec = np.clip((years - 1950) / 75.0, 0, 1)
+
+    # User interest: one dict lookup per distinct title word
+    if user_interest:
+        hits = np.array([sum(user_interest.get(w, 0.0) for w in set(t_norm.split())) for t_norm in t_norms])
+    else:
+        hits = np.zeros(n)
+    u_int = np.minimum(1.0, 0.2 * hits)
+
+    final_score = (0.5 * final_rel) + (0.2 * pop) + (0.2 * rec) + (0.1 * u_int)
+    hybrid = np.array([float(f"{s:.3f}") for s in final_score])
+    for r, s in zip(results, hybrid):
+        r["hybrid_score"] = float(s)
+        r["score"] = r["hybrid_score"] # Explicit score key mapping as requested
+
+    is_exact = (nlp >= 15) | (final_rel > 0.85)
+    if ctx.q_norm:
+        is_exact |= np.array([ctx.q_norm == t for t in t_norms], dtype=bool)
+    is_related = ~is_exact & ((nlp > 0) | (final_rel > 0.4))
+    is_recommended = ~is_exact & ~is_related
+
+    def bucket(mask):
+        idx = np.flatnonzero(mask)
+        # Stable descending sort, same tie order as list.sort(reverse=True)
+        return [results[i] for i in idx[np.argsort(-hybrid[idx], kind='stable')]]
+
+    exact_matches = bucket(is_exact)
+    related_results = bucket(is_related)
+    recommended = bucket(is_recommended)
+
+    if not recommended and len(related_results) > 6:
+        split_idx = len(related_results) // 2
+        recommended = related_results[split_idx:]
+        related_results = related_results[:split_idx]
+
+    if not related_results and len(recommended) > 6:
+        split_idx = len(recommended) // 2
+        related_results = recommended[:split_idx]
+        recommended = recommended[split_idx:]
+
+    return {
+        "exact_matches": exact_matches,
+        "related_results": related_results,
+        "recommended": recommended
+    }
@@ -0,0 +1,93 @@
+import concurrent.futures
+import threading
+import time
+from collections import OrderedDict
+
+class SWRCache:
+    """In-process TTL cache that serves expired entries while refreshing them in the background.
+
+    An entry is fresh for `ttl` seconds (or `ttl_for(value)` if given), then
+    served stale for another `stale_for` seconds while one background refresh
+    runs; after that it is recomputed in the caller. Concurrent misses on the
+    same key wait for a single computation. `compute` returning None means
+    "do not cache" (e.g. an upstream error).
+    """
+
+    def __init__(self, ttl, stale_for, max_entries=512, ttl_for=None, refresh_workers=4):
+        self.ttl = ttl
+        self.stale_for = stale_for
+        self.max_entries = max_entries
+        self.ttl_for = ttl_for
+        self._entries = OrderedDict()  # key -> (value, fresh_until, stale_until)
+        self._inflight = {}            # key -> Future of a running computation
+        self._lock = threading.Lock()
+        self._refresher = concurrent.futures.ThreadPoolExecutor(max_workers=refresh_workers,
+                                                                thread_name_prefix='swr-refresh')
+        self.stats = {"fresh": 0, "stale": 0, "miss": 0, "errors": 0}
+
+    def get(self, key, compute):
+        """Returns (value, status) where status is 'fresh', 'stale' or 'miss'."""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                value, fresh_until, stale_until = entry
+                if now < fresh_until:
+                    self._entries.move_to_end(key)
+                    self.stats["fresh"] += 1
+                    return value, "fresh"
+                if now < stale_until:
+                    self._entries.move_to_end(key)
+                    self.stats["stale"] += 1
+                    if key not in self._inflight:
+                        self._inflight[key] = self._refresher.submit(self._compute, key, compute)
+                    return value, "stale"
+            self.stats["miss"] += 1
+            future = self._inflight.get(key)
+            owner = future is None
+            if owner:
+                future = concurrent.futures.Future()
+                self._inflight[key] = future
+
+        if not owner:
+            return future.result(), "miss"
+        try:
+            value = self._compute(key, compute)
+        except Exception as e:
+            future.set_exception(e)
+            raise
+        future.set_result(value)
+        return value, "miss"
+
+    def peek(self, key):
+        """Returns the cached value (fresh or stale) without computing or refreshing, else None."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or time.monotonic() >= entry[2]:
+                return None
+            return entry[0]
+
+    def put(self, key, value):
+        """Stores a value computed outside get(), e.g. by a streaming request."""
+        self._compute(key, lambda: value)
+
+    def _compute(self, key, compute):
+        try:
+            value = compute()
+        except Exception as e:
+            self.stats["errors"] += 1
+            print(f"SWR cache compute error for {key!r}: {e}")
+            with self._lock:
+                self._inflight.pop(key, None)
+            raise
+        with self._lock:
+            if value is not None:
+                ttl = self.ttl_for(value) if self.ttl_for else self.ttl
+                now = time.monotonic()
+                self._entries[key] = (value, now + ttl, now + ttl + self.stale_for)
+                self._entries.move_to_end(key)
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+            # Stored before the in-flight marker goes, so no second computation can slip in
+            self._inflight.pop(key, None)
+        return value
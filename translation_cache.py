@@ -0,0 +1,181 @@
+import re
+import sqlite3
+import threading
+from collections import OrderedDict
+from deep_translator import GoogleTranslator
+
+# Google Translate rejects requests over 5000 characters; keep some headroom
+BATCH_CHAR_LIMIT = 4500
+
+UZ_CYRILLIC_LETTERS = set("ўқғҳЎҚҒҲ")
+# o'/g' followed by a lowercase letter (o'zbek, bo'yicha, to'g'ri), but not an English
+# possessive ("Mexico's", "King's") or an Irish name ("O'Brien")
+UZ_APOSTROPHE_RE = re.compile(r"[OoGg][\'‘’`ʻʼ](?!s\b)[a-z]")
+UZ_STOPWORDS = {"va", "bilan", "uchun", "haqida", "yoki", "ham", "bu", "ushbu", "orqali", "asosida", "sifatida"}
+UZ_SUFFIXES = ("larning", "lari", "larda", "ning", "dagi", "lik", "ligi", "larni", "ini", "ida", "gan")
+
+def looks_uzbek(text):
+    """Cheap check for text that is already Uzbek, so it does not need translating to 'uz'."""
+    if not text:
+        return False
+    if any(ch in UZ_CYRILLIC_LETTERS for ch in text):
+        return True
+    if UZ_APOSTROPHE_RE.search(text):
+        return True
+    words = re.findall(r"[a-z]+", text.lower())
+    if not words:
+        return False
+    hits = sum(1 for w in words if w in UZ_STOPWORDS or (len(w) > 5 and w.endswith(UZ_SUFFIXES)))
+    return hits >= 2 and hits * 3 >= len(words)
+
+class CachedTranslator:
+    """GoogleTranslator behind an in-process LRU and a persistent SQLite cache.
+
+    Entries are keyed by (text, target language). Cache misses are joined with
+    newlines and sent as a few large requests instead of one request per text.
+    Failed translations are never cached, so they are retried next time.
+    """
+
+    def __init__(self, db_path, lru_size=5000):
+        self.lru_size = lru_size
+        self._lru = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {"lru_hits": 0, "db_hits": 0, "misses": 0, "skipped_uz": 0,
+                       "batches": 0, "errors": 0}
+        try:
+            self._conn = sqlite3.connect(db_path, check_same_thread=False)
+            self._conn.execute('''CREATE TABLE IF NOT EXISTS translations
+                                  (lang TEXT NOT NULL,
+                                   text TEXT NOT NULL,
+                                   translated TEXT NOT NULL,
+                                   PRIMARY KEY (lang, text)) WITHOUT ROWID''')
+            self._conn.commit()
+        except sqlite3.Error as e:
+            # Read-only or missing filesystem: keep working with the LRU only
+            print(f"Translation cache DB error: {e}")
+            self._conn = None
+
+    def translate(self, text, target):
+        return self.translate_many([text], target)[0]
+
+    def translate_many(self, texts, target):
+        """Returns translations in input order. Texts that fail to translate are returned as-is."""
+        out = list(texts)
+        missing = {}
+        for i, text in enumerate(texts):
+            if not text:
+                out[i] = ""
+                continue
+            if target == 'uz' and looks_uzbek(text):
+                self._count("skipped_uz")
+                continue
+            cached = self._lookup(text, target)
+            if cached is not None:
+                out[i] = cached
+            else:
+                missing.setdefault(text, []).append(i)
+
+        if missing:
+            self._count("misses", len(missing))
+            translated = self._translate_batch(list(missing), target)
+            fresh = []
+            for text, result in zip(missing, translated):
+                if result is None:
+                    continue
+                fresh.append((text, result))
+                for i in missing[text]:
+                    out[i] = result
+            self._store(fresh, target)
+        return out
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            stats["lru_entries"] = len(self._lru)
+        lookups = stats["lru_hits"] + stats["db_hits"] + stats["misses"]
+        stats["hit_rate"] = round((stats["lru_hits"] + stats["db_hits"]) / lookups, 3) if lookups else 0.0
+        return stats
+
+    def _count(self, key, n=1):
+        with self._lock:
+            self._stats[key] += n
+
+    def _remember(self, key, value):
+        # Caller holds self._lock
+        self._lru[key] = value
+        self._lru.move_to_end(key)
+        if len(self._lru) > self.lru_size:
+            self._lru.popitem(last=False)
+
+    def _lookup(self, text, target):
+        key = (text, target)
+        with self._lock:
+            if key in self._lru:
+                self._lru.move_to_end(key)
+                self._stats["lru_hits"] += 1
+                return self._lru[key]
+            if self._conn is None:
+                return None
+            row = self._conn.execute("SELECT translated FROM translations WHERE lang = ? AND text = ?",
+                                     (target, text)).fetchone()
+            if row:
+                self._stats["db_hits"] += 1
+                self._remember(key, row[0])
+                return row[0]
+        return None
+
+    def _store(self, pairs, target):
+        if not pairs:
+            return
+        with self._lock:
+            for text, result in pairs:
+                self._remember((text, target), result)
+            if self._conn is None:
+                return
+            try:
+                self._conn.executemany("INSERT OR REPLACE INTO translations (lang, text, translated) VALUES (?, ?, ?)",
+                                       [(target, text, result) for text, result in pairs])
+                self._conn.commit()
+            except sqlite3.Error as e:
+                print(f"Translation cache write error: {e}")
+
+    def _chunks(self, texts):
+        chunk, size = [], 0
+        for text in texts:
+            if chunk and size + len(text) + 1 > BATCH_CHAR_LIMIT:
+                yield chunk
+                chunk, size = [], 0
+            chunk.append(text)
+            size += len(text) + 1
+        if chunk:
+            yield chunk
+
+    def _translate_one(self, text, target):
+        try:
+            return GoogleTranslator(source='auto', target=target).translate(text)
+        except Exception:
+            self._count("errors")
+            return None
+
+    def _translate_batch(self, texts, target):
+        """Translates texts with one request per chunk; None marks a failed item."""
+        out = []
+        for chunk in self._chunks(texts):
+            if len(chunk) == 1:
+                out.append(self._translate_one(chunk[0], target))
+                continue
+            self._count("batches")
+            # Newlines separate the items, so they must not occur inside one
+            joined = "\n".join(" ".join(t.split()) for t in chunk)
+            parts = []
+            try:
+                translated = GoogleTranslator(source='auto', target=target).translate(joined)
+                parts = translated.split("\n") if translated else []
+            except Exception:
+                self._count("errors")
+            if len(parts) == len(chunk):
+                out.extend(p.strip() for p in parts)
+            else:
+                # The translator merged or split lines; fall back to one request per item
+                out.extend(self._translate_one(t, target) for t in chunk)
+        return out
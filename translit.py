@@ -0,0 +1,46 @@
+import re
+
+# Uzbek Latin -> Cyrillic. Digraphs are listed first for readability only;
+# the matcher below always prefers the longest key at each position.
+LATIN_TO_CYRILLIC = {
+    "shch": "щ",
+    "sh": "ш", "ch": "ч", "ya": "я", "yo": "ё", "yu": "ю", "o'": "ў", "g'": "ғ",
+    "a": "а", "b": "б", "d": "д", "e": "е", "f": "ф", "g": "г", "h": "ҳ",
+    "i": "и", "j": "ж", "k": "к", "l": "л", "m": "м", "n": "н", "o": "о",
+    "p": "п", "q": "қ", "r": "р", "s": "с", "t": "т", "u": "у", "v": "в",
+    "x": "х", "y": "й", "z": "з", "c": "ц",
+    "SH": "Ш", "CH": "Ч", "YA": "Я", "YO": "Ё", "YU": "Ю", "O'": "Ў", "G'": "Ғ",
+    "A": "А", "B": "Б", "D": "Д", "E": "Е", "F": "Ф", "G": "Г", "H": "Ҳ",
+    "I": "И", "J": "Ж", "K": "К", "L": "Л", "M": "М", "N": "Н", "O": "О",
+    "P": "П", "Q": "Қ", "R": "Р", "S": "С", "T": "Т", "U": "У", "V": "В",
+    "X": "Х", "Y": "Й", "Z": "З", "C": "Ц", "'": "ъ"
+}
+
+CYRILLIC_TO_LATIN = {v: k for k, v in LATIN_TO_CYRILLIC.items()}
+# Hardcoded fixes for some edge cases
+CYRILLIC_TO_LATIN['э'] = 'e'
+CYRILLIC_TO_LATIN['Э'] = 'E'
+CYRILLIC_TO_LATIN['ы'] = 'y'
+CYRILLIC_TO_LATIN['Ы'] = 'Y'
+
+# Built once at import. Every Cyrillic key is a single character, so
+# Cyrillic -> Latin is a plain str.translate. Latin -> Cyrillic replaces the
+# digraphs in one longest-first regex scan (so "shch", "sh", "o'", "g'" win
+# over their letters), then maps the remaining single letters with translate.
+_C2L_TABLE = str.maketrans(CYRILLIC_TO_LATIN)
+_L2C_TABLE = str.maketrans({k: v for k, v in LATIN_TO_CYRILLIC.items() if len(k) == 1})
+_L2C_DIGRAPH_RE = re.compile("|".join(re.escape(k) for k in sorted((k for k in LATIN_TO_CYRILLIC if len(k) > 1), key=len, reverse=True)))
+_CYRILLIC_RE = re.compile('[\u0400-\u04FF]')
+
+def _l2c(match):
+    return LATIN_TO_CYRILLIC[match.group()]
+
+def transliterate(text):
+    """Converts Cyrillic text to Latin and anything else to Cyrillic."""
+    if not text: return text
+    if _CYRILLIC_RE.search(text):
+        return text.translate(_C2L_TABLE)
+    return _L2C_DIGRAPH_RE.sub(_l2c, text).translate(_L2C_TABLE)
+
+def transliterate_many(texts):
+    return [transliterate(t) for t in texts]